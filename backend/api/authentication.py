@@ -0,0 +1,109 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.fields.files import FieldFile
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Поля пользователя, которые хранятся в кэше. Пароль и счётчики,
+# которые меняются через update() без сигналов, отложены и при
+# обращении читаются из базы.
+CACHED_USER_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name',
+                      'avatar', 'avatar_variants', 'is_active', 'is_staff',
+                      'is_superuser')
+
+
+class LocalTokenCache:
+    """Ограниченный LRU-кэш токенов процесса с временем жизни записей."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+_local_tokens = LocalTokenCache(settings.AUTH_TOKEN_LOCAL_SIZE)
+
+
+def _token_cache_key(key):
+    return f'auth_token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _cache_entry(token):
+    """Токен и урезанная копия его пользователя для кэша."""
+    user = token.user
+    user_model = type(user)
+    names, values = [], []
+    for field in user_model._meta.concrete_fields:
+        if field.name in CACHED_USER_FIELDS:
+            value = getattr(user, field.attname)
+            names.append(field.attname)
+            values.append(value.name if isinstance(value, FieldFile)
+                          else value)
+    cached_user = user_model.from_db(user._state.db, names, values)
+    return cached_user, Token(
+        key=token.key, user_id=token.user_id, created=token.created)
+
+
+def invalidate_token(key):
+    """Забыть токен в общем кэше и в кэше текущего процесса.
+
+    Остальные процессы перестанут принимать токен не позже чем через
+    AUTH_TOKEN_LOCAL_TIMEOUT секунд.
+    """
+    cache_key = _token_cache_key(key)
+    _local_tokens.delete(cache_key)
+    cache.delete(cache_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе на каждый запрос.
+
+    Токен вместе с пользователем ищется сначала в LRU процесса, затем
+    в общем кэше и только потом в базе. В кэше лежат только поля
+    CACHED_USER_FIELDS.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _token_cache_key(key)
+        entry = _local_tokens.get(cache_key)
+        if entry is None:
+            entry = cache.get(cache_key)
+            if entry is None:
+                _, token = super().authenticate_credentials(key)
+                entry = _cache_entry(token)
+                cache.set(cache_key, entry, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            _local_tokens.set(
+                cache_key, entry, settings.AUTH_TOKEN_LOCAL_TIMEOUT)
+        user, token = entry
+        # Запись LRU общая для потоков процесса, а представления могут
+        # менять request.user, поэтому каждый запрос получает копию.
+        return copy.copy(user), token
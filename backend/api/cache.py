@@ -0,0 +1,115 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+from recipes.models import Favorite, ShoppingCart, Tag
+from users.models import Follow
+
+CONTENT_VERSION = 'content'
+# Рейтинг популярности: от него зависят только выборки по популярности.
+POPULARITY_VERSION = 'popularity'
+TAGS_VERSION = 'tags'
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """Вернуть текущую версию набора закэшированных данных."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(name):
+    """Сделать устаревшими все ключи, построенные на версии name.
+
+    Возвращает новую версию.
+    """
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_etag(version_name, request):
+    """Сильный ETag: версия данных, запрос и формат ответа."""
+    raw = (f'{get_version(version_name)}:{request.get_full_path()}:'
+           f'{request.accepted_renderer.format}')
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def response_cache_key(namespace, request, versions=(CONTENT_VERSION,)):
+    """Ключ ответа: версии данных, адрес и все параметры запроса."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    location = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+    digest = hashlib.md5(location.encode()).hexdigest()
+    version = ':'.join(str(get_version(name)) for name in versions)
+    return f'response:{namespace}:{version}:{digest}'
+
+
+def get_or_set_response_data(namespace, request, build_response,
+                             versions=(CONTENT_VERSION,)):
+    """Вернуть данные ответа из кэша или построить и сохранить их."""
+    key = response_cache_key(namespace, request, versions)
+    data = cache.get(key)
+    if data is None:
+        data = build_response().data
+        cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+    return data
+
+
+def get_tag_map():
+    """Вернуть соответствие slug -> id всех тегов."""
+    key = f'tag_map:{get_version(TAGS_VERSION)}'
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_map, timeout=None)
+    return tag_map
+
+
+def _user_flags_key(user_id):
+    return f'user_flags:{user_id}'
+
+
+def get_user_flags(user):
+    """Вернуть множества id избранного, корзины и подписок пользователя."""
+    key = _user_flags_key(user.id)
+    flags = cache.get(key)
+    if flags is None:
+        flags = {
+            'favorites': frozenset(Favorite.objects.filter(
+                user=user).values_list('recipe_id', flat=True)),
+            'shopping_cart': frozenset(ShoppingCart.objects.filter(
+                user=user).values_list('recipe_id', flat=True)),
+            'following': frozenset(Follow.objects.filter(
+                user=user).values_list('following_id', flat=True)),
+        }
+        cache.set(key, flags, settings.USER_FLAGS_CACHE_TIMEOUT)
+    return flags
+
+
+def invalidate_user_flags(user_id):
+    cache.delete(_user_flags_key(user_id))
+
+
+def overlay_user_flags(recipes, flags):
+    """Проставить флаги пользователя в общих данных рецептов."""
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in flags['favorites']
+        recipe['is_in_shopping_cart'] = (
+            recipe['id'] in flags['shopping_cart'])
+        author = recipe['author']
+        author['is_subscribed'] = author['id'] in flags['following']
+    return recipes
@@ -0,0 +1,88 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+from constants import INGREDIENT_SUBSTRING_MIN_LENGTH
+from recipes.models import Ingredient
+
+from .cache import get_version
+
+INGREDIENTS_VERSION = 'ingredients'
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+class IngredientCatalog:
+    """Неизменяемый снимок таблицы ингредиентов в памяти процесса.
+
+    Строки хранятся параллельными кортежами, отсортированными по названию
+    в нижнем регистре, поэтому поиск по началу названия — бинарный поиск.
+    """
+
+    __slots__ = ('version', 'ids', 'names', 'units', 'keys',
+                 'sorted_ids', 'id_positions')
+
+    def __init__(self, version, rows):
+        rows = sorted(rows, key=lambda row: (row[1].lower(), row[0]))
+        self.version = version
+        self.ids = array('q', (row[0] for row in rows))
+        self.names = tuple(row[1] for row in rows)
+        self.units = tuple(row[2] for row in rows)
+        self.keys = tuple(row[1].lower() for row in rows)
+        id_order = sorted(range(len(rows)), key=self.ids.__getitem__)
+        self.sorted_ids = array('q', (self.ids[i] for i in id_order))
+        self.id_positions = array('l', id_order)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, position):
+        return {
+            'id': self.ids[position],
+            'name': self.names[position],
+            'measurement_unit': self.units[position],
+        }
+
+    def all(self):
+        return [self.row(position) for position in range(len(self))]
+
+    def get(self, pk):
+        position = bisect_left(self.sorted_ids, pk)
+        if (position < len(self.sorted_ids)
+                and self.sorted_ids[position] == pk):
+            return self.row(self.id_positions[position])
+        return None
+
+    def search(self, value, limit):
+        """Совпадения по началу названия, затем по вхождению."""
+        value = value.lower()
+        positions = []
+        position = bisect_left(self.keys, value)
+        while (position < len(self) and len(positions) < limit
+               and self.keys[position].startswith(value)):
+            positions.append(position)
+            position += 1
+
+        if len(value) >= INGREDIENT_SUBSTRING_MIN_LENGTH:
+            for position, key in enumerate(self.keys):
+                if len(positions) >= limit:
+                    break
+                if value in key and not key.startswith(value):
+                    positions.append(position)
+        return [self.row(position) for position in positions]
+
+
+def get_ingredient_catalog():
+    """Вернуть каталог, перечитав его после смены версии ингредиентов."""
+    global _catalog
+    version = get_version(INGREDIENTS_VERSION)
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = IngredientCatalog(
+                    version, Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit').iterator())
+            catalog = _catalog
+    return catalog
@@ -0,0 +1,161 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import RecipeIngredient
+
+from .cache import bump_version, get_version
+
+RECIPE_INGREDIENTS_VERSION = 'recipe_ingredients'
+CHANGE_LOG_SIZE = 1000
+CHANGE_LOG_TIMEOUT = 24 * 60 * 60
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _change_key(version):
+    return f'recipe_ingredients_change:{version}'
+
+
+class IngredientCoverageIndex:
+    """Инвертированный индекс: ингредиент -> отсортированные id рецептов.
+
+    Снимок не изменяется на месте: изменения рецептов создают новый
+    индекс, в котором заменены только затронутые списки.
+    """
+
+    __slots__ = ('version', 'postings', 'recipes')
+
+    def __init__(self, version, postings, recipes):
+        self.version = version
+        self.postings = postings
+        self.recipes = recipes
+
+    @classmethod
+    def build(cls, version, rows):
+        """Построить индекс по строкам (recipe_id, ingredient_id)."""
+        postings, recipes = {}, {}
+        for recipe_id, ingredient_id in rows:
+            postings.setdefault(ingredient_id, []).append(recipe_id)
+            recipes.setdefault(recipe_id, []).append(ingredient_id)
+        return cls(
+            version,
+            {key: array('q', sorted(ids)) for key, ids in postings.items()},
+            {key: tuple(ids) for key, ids in recipes.items()},
+        )
+
+    def apply(self, version, changes):
+        """Вернуть индекс с новым составом изменённых рецептов."""
+        postings, recipes = dict(self.postings), dict(self.recipes)
+        copied = set()
+
+        def posting(ingredient_id):
+            if ingredient_id not in copied:
+                copied.add(ingredient_id)
+                postings[ingredient_id] = array(
+                    'q', postings.get(ingredient_id, ()))
+            return postings[ingredient_id]
+
+        for recipe_id, ingredient_ids in changes:
+            old, new = set(recipes.get(recipe_id, ())), set(ingredient_ids)
+            for ingredient_id in old - new:
+                ids = posting(ingredient_id)
+                position = bisect_left(ids, recipe_id)
+                if position < len(ids) and ids[position] == recipe_id:
+                    ids.pop(position)
+            for ingredient_id in new - old:
+                ids = posting(ingredient_id)
+                position = bisect_left(ids, recipe_id)
+                if position == len(ids) or ids[position] != recipe_id:
+                    insort(ids, recipe_id)
+            if new:
+                recipes[recipe_id] = tuple(ingredient_ids)
+            else:
+                recipes.pop(recipe_id, None)
+        return IngredientCoverageIndex(version, postings, recipes)
+
+    def top(self, ingredient_ids, limit):
+        """Рецепты с наибольшей долей имеющихся ингредиентов.
+
+        Возвращает кортежи (recipe_id, совпало, всего ингредиентов),
+        при равной доле выше рецепт с меньшим числом недостающих
+        ингредиентов, затем более новый.
+        """
+        matches = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matches.update(self.postings.get(ingredient_id, ()))
+        recipes = self.recipes
+        best = heapq.nlargest(
+            limit, matches.items(),
+            key=lambda item: (item[1] / len(recipes[item[0]]),
+                              item[1] - len(recipes[item[0]]),
+                              item[0]))
+        return [(recipe_id, matched, len(recipes[recipe_id]))
+                for recipe_id, matched in best]
+
+
+def _load_index(version):
+    return IngredientCoverageIndex.build(
+        version, RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id').iterator())
+
+
+def _read_changes(since, version):
+    """Изменения после версии since или None, если журнал неполон."""
+    if not 0 < version - since <= CHANGE_LOG_SIZE:
+        return None
+    keys = [_change_key(number) for number in range(since + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys) or None in changes.values():
+        return None
+    return [changes[key] for key in keys]
+
+
+def get_coverage_index():
+    """Вернуть индекс, догнав его по журналу изменений или перечитав."""
+    global _index
+    version = get_version(RECIPE_INGREDIENTS_VERSION)
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            index = _index
+            if index is None or index.version != version:
+                changes = (None if index is None
+                           else _read_changes(index.version, version))
+                if changes is None:
+                    index = _load_index(version)
+                else:
+                    index = index.apply(version, changes)
+                _index = index
+    return index
+
+
+def _append_change(change):
+    version = bump_version(RECIPE_INGREDIENTS_VERSION)
+    cache.set(_change_key(version), change, CHANGE_LOG_TIMEOUT)
+
+
+def record_recipe_ingredients(recipe_id, ingredient_ids):
+    """Записать новый состав рецепта в журнал после фиксации транзакции.
+
+    Пустой состав означает удалённый рецепт.
+    """
+    change = (recipe_id, tuple(ingredient_ids))
+    transaction.on_commit(lambda: _append_change(change))
+
+
+def refresh_recipe_ingredients(recipe_id):
+    """Записать в журнал состав рецепта, прочитанный из базы."""
+    ingredient_ids = RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', flat=True)
+    _append_change((recipe_id, tuple(ingredient_ids)))
+
+
+def reset_coverage_index():
+    """Заставить все процессы перечитать индекс из базы."""
+    transaction.on_commit(lambda: _append_change(None))
@@ -0,0 +1,148 @@
+import csv
+import hashlib
+import json
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from recipes.models import Ingredient
+
+from .cache import CONTENT_VERSION, get_version
+from .catalog import INGREDIENTS_VERSION
+from .pdf_utils import SPOOL_MAX_SIZE, create_pdf
+
+CURSOR_CHUNK_SIZE = 500
+TITLE = 'Список покупок'
+CSV_HEADER = ('name', 'measurement_unit', 'total_amount')
+
+
+def get_shopping_cart_ingredients(user):
+    """Вернуть ингредиенты в корзине пользователя."""
+    return (Ingredient.objects
+            .filter(recipe__shopping__user=user)
+            .values('name', 'measurement_unit')
+            .annotate(total_amount=Sum('recipeingredient__amount'))
+            .order_by('name', 'measurement_unit'))
+
+
+def iter_ingredient_rows(user):
+    """Читать корзину серверным курсором, не загружая её целиком."""
+    return get_shopping_cart_ingredients(user).iterator(
+        chunk_size=CURSOR_CHUNK_SIZE)
+
+
+def format_line(ingredient):
+    return (f"{ingredient['name']} - "
+            f"{ingredient['measurement_unit']} - "
+            f"{ingredient['total_amount']}")
+
+
+def iter_txt(ingredients):
+    yield f'{TITLE}\n\n'
+    for ingredient in ingredients:
+        yield format_line(ingredient) + '\n'
+
+
+class _Echo:
+    """Файлоподобный объект, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(ingredients):
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+    for ingredient in ingredients:
+        yield writer.writerow(
+            [ingredient[field] for field in CSV_HEADER])
+
+
+def iter_pdf(ingredients):
+    pdf_file = create_pdf(ingredients)
+    with pdf_file:
+        yield from iter(lambda: pdf_file.read(64 * 1024), b'')
+
+
+EXPORT_FORMATS = {
+    'pdf': (iter_pdf, 'application/pdf'),
+    'txt': (iter_txt, 'text/plain; charset=utf-8'),
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+}
+
+
+def cart_version_name(user_id):
+    return f'shopping_cart:{user_id}'
+
+
+def get_cart_state(user):
+    """Вернуть дайджест содержимого корзины и время его изменения.
+
+    Дайджест хранится в кэше, пока не изменились корзина пользователя,
+    рецепты или ингредиенты. Третьим элементом возвращаются строки
+    корзины, если их пришлось прочитать из базы, иначе None.
+    """
+    versions = (get_version(cart_version_name(user.id)),
+                get_version(CONTENT_VERSION),
+                get_version(INGREDIENTS_VERSION))
+    key = f'shopping_cart_state:{user.id}'
+    state = cache.get(key)
+    if state is not None and state['versions'] == versions:
+        return state['digest'], state['last_modified'], None
+
+    ingredients = list(get_shopping_cart_ingredients(user))
+    digest = hashlib.sha256(json.dumps(
+        ingredients, ensure_ascii=False).encode()).hexdigest()
+    if state is not None and state['digest'] == digest:
+        last_modified = state['last_modified']
+    else:
+        last_modified = int(time.time())
+    cache.set(key, {
+        'versions': versions,
+        'digest': digest,
+        'last_modified': last_modified,
+    }, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+    return digest, last_modified, ingredients
+
+
+def iter_shopping_list(digest, file_format, ingredients):
+    """Отдать файл из кэша или отрисовать его, сохранив в кэш по дайджесту.
+
+    Файлы больше SHOPPING_LIST_CACHE_MAX_SIZE не кэшируются и просто
+    отдаются потоком.
+    """
+    key = f'shopping_list:{digest}:{file_format}'
+    content = cache.get(key)
+    if content is not None:
+        yield content
+        return
+
+    render, _ = EXPORT_FORMATS[file_format]
+    chunks, size = [], 0
+    for chunk in render(ingredients):
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        yield chunk
+        if chunks is not None:
+            size += len(chunk)
+            if size > settings.SHOPPING_LIST_CACHE_MAX_SIZE:
+                chunks = None
+            else:
+                chunks.append(chunk)
+    if chunks is not None:
+        cache.set(key, b''.join(chunks),
+                  settings.SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def render_to_file(file_format, ingredients):
+    """Отрисовать список покупок во временный файл."""
+    if file_format == 'pdf':
+        return create_pdf(ingredients)
+    render, _ = EXPORT_FORMATS[file_format]
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for chunk in render(ingredients):
+        output.write(chunk.encode())
+    output.seek(0)
+    return output
@@ -0,0 +1,152 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def pushes_to_feeds(author_id):
+    """Рецепты автора раскладываются по лентам, пока подписчиков немного.
+
+    Автор, у которого подписчиков стало больше FEED_FANOUT_LIMIT,
+    навсегда переходит на чтение рецептов при запросе ленты: иначе
+    после отписок из лент пропали бы рецепты, опубликованные без
+    раскладки. Число подписчиков и флаг читаются из базы.
+    """
+    row = User.objects.filter(pk=author_id).values_list(
+        'followers_count', 'feed_pull').first()
+    if row is None:
+        return False
+    followers_count, feed_pull = row
+    if feed_pull:
+        return False
+    if followers_count > settings.FEED_FANOUT_LIMIT:
+        User.objects.filter(pk=author_id).update(feed_pull=True)
+        return False
+    return True
+
+
+def fan_out_recipe(recipe):
+    """Добавить новый рецепт в ленты подписчиков автора."""
+    if not pushes_to_feeds(recipe.author_id):
+        return 0
+    follower_ids = Follow.objects.filter(
+        following=recipe.author_id).values_list('user_id', flat=True)
+    entries = FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe=recipe,
+                   created_at=recipe.created_at)
+         for user_id in follower_ids.iterator()),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_feed(user_id, author_id):
+    """Заполнить ленту последними рецептами нового автора подписки."""
+    if not pushes_to_feeds(author_id):
+        return
+    recipes = (Recipe.objects
+               .filter(author_id=author_id)
+               .order_by('-created_at', '-id')
+               .values_list('id', 'created_at')[:settings.FEED_LENGTH])
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                   created_at=created_at)
+         for recipe_id, created_at in recipes],
+        ignore_conflicts=True)
+    trim_feeds([user_id])
+
+
+def remove_from_feed(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id).delete()
+
+
+def trim_feeds(user_ids=None):
+    """Оставить в лентах не больше FEED_LENGTH последних рецептов.
+
+    Граница проходит по ключу (created_at, recipe_id), как и чтение
+    ленты: записи с тем же временем, что у границы, не теряются.
+    Возвращает число удалённых записей.
+    """
+    length = settings.FEED_LENGTH
+    if user_ids is None:
+        user_ids = list(FeedEntry.objects
+                        .values('user_id')
+                        .annotate(entries=Count('pk'))
+                        .filter(entries__gt=length)
+                        .values_list('user_id', flat=True))
+    deleted = 0
+    for user_id in user_ids:
+        entries = FeedEntry.objects.filter(user_id=user_id)
+        cutoff = (entries
+                  .order_by('-created_at', '-recipe_id')
+                  .values_list('created_at', 'recipe_id')[length:length + 1])
+        if cutoff:
+            created_at, recipe_id = cutoff[0]
+            deleted += entries.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, recipe_id__lte=recipe_id)
+            ).delete()[0]
+    return deleted
+
+
+def _before(key, id_field):
+    """Записи после key = (created_at, id) в порядке ленты."""
+    created_at, pk = key
+    return (Q(created_at__lt=created_at)
+            | Q(created_at=created_at, **{f'{id_field}__lt': pk}))
+
+
+def read_feed(user, limit, after=None, recipes=None):
+    """Ключи (created_at, recipe_id) первых limit рецептов ленты.
+
+    Разложенные рецепты читаются из FeedEntry по индексу
+    (user, -created_at), рецепты авторов в режиме чтения — из Recipe,
+    оба запроса ограничены limit строками после ключа after. recipes —
+    отфильтрованные параметрами запроса рецепты или None.
+    """
+    pushed = FeedEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(author__in=Follow.objects.filter(
+        user=user, following__feed_pull=True).values('following_id'))
+    if after is not None:
+        pushed = pushed.filter(_before(after, 'recipe_id'))
+        pulled = pulled.filter(_before(after, 'id'))
+    if recipes is not None:
+        pushed = pushed.filter(recipe__in=recipes.values('pk'))
+        pulled = pulled.filter(pk__in=recipes.values('pk'))
+    # Рецепт автора, перешедшего на чтение, может быть в обоих списках.
+    keys = set(pushed
+               .order_by('-created_at', '-recipe_id')
+               .values_list('created_at', 'recipe_id')[:limit])
+    keys.update(pulled
+                .order_by('-created_at', '-id')
+                .values_list('created_at', 'id')[:limit])
+    return sorted(keys, reverse=True)[:limit]
+
+
+def encode_feed_cursor(key):
+    created_at, pk = key
+    raw = f'{created_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_feed_cursor(cursor):
+    """Ключ (created_at, recipe_id) из курсора или None, если он неверен."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, pk = raw.split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
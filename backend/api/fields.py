@@ -0,0 +1,102 @@
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from .images import cap_image, is_built
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, который берёт объекты из одного IN-запроса.
+
+    Список значений загружает родитель — BulkManyRelatedField или
+    BulkRelatedListSerializer, а ошибки остаются теми же, что и у
+    PrimaryKeyRelatedField.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prefetched = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_pk(self, value):
+        if self.pk_field is not None or isinstance(value, bool):
+            return None
+        try:
+            return self.get_queryset().model._meta.pk.to_python(value)
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def prefetch(self, values):
+        """Загрузить объекты по всем переданным значениям."""
+        pks = {pk for pk in map(self.to_pk, values) if pk is not None}
+        self.prefetched = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        pk = None if self.prefetched is None else self.to_pk(data)
+        if pk is None:
+            return super().to_internal_value(data)
+        try:
+            return self.prefetched[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if not isinstance(data, str) and hasattr(data, '__iter__'):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class BulkRelatedListSerializer(serializers.ListSerializer):
+    """Загружает связанные объекты всех элементов списка сразу.
+
+    Загружаются поля BulkPrimaryKeyRelatedField дочернего сериализатора.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, Mapping)]
+            for name, field in self.child.fields.items():
+                if isinstance(field, BulkPrimaryKeyRelatedField):
+                    field.prefetch(item.get(name) for item in items)
+        return super().to_internal_value(data)
+
+
+class CappedBase64ImageField(Base64ImageField):
+    """Base64ImageField, уменьшающий слишком большие изображения."""
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        return None if file is None else cap_image(file)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии: {имя копии: {формат: url}}.
+
+    Пока копии не построены или их сборка упала, поле равно null.
+    """
+
+    def to_representation(self, value):
+        if not is_built(value):
+            return None
+        request = self.context.get('request')
+        variants = {}
+        for name, paths in value.items():
+            variants[name] = {}
+            for image_format, path in paths.items():
+                url = default_storage.url(path)
+                variants[name][image_format] = (
+                    request.build_absolute_uri(url) if request else url)
+        return variants
@@ -1,26 +1,133 @@
+from constants import INGREDIENT_SUBSTRING_MIN_LENGTH
+from django.db.models import (Case, Exists, F, IntegerField, OuterRef, Value,
+                              When)
+from django.db.models.functions import Lower
 from django_filters import rest_framework as filters
-from recipes.models import Ingredient, Recipe
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.search import search_recipes
+from rest_framework.filters import OrderingFilter
+
+from .cache import get_tag_map
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
 
 
 class RecipeFilter(filters.FilterSet):
     """Фильтрация модели Рецепт."""
 
-    is_favorited = filters.BooleanFilter(field_name='is_favorited')
+    is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
-        field_name='is_in_shopping_cart')
+        method='filter_is_in_shopping_cart')
     author = filters.CharFilter(field_name='author__id')
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'is_in_shopping_cart', 'author', 'tags']
+        fields = ['is_favorited', 'is_in_shopping_cart', 'author', 'tags',
+                  'search']
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, ShoppingCart, value)
+
+    def filter_user_recipes(self, queryset, model, value):
+        """Полусоединение по строкам пользователя в избранном/корзине.
+
+        Подзапрос идёт от записей пользователя по уникальному индексу
+        (user, recipe), а не вычисляет EXISTS для каждого рецепта.
+        """
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return queryset.none() if value else queryset
+        recipe_ids = model.objects.filter(user=user).values('recipe_id')
+        if value:
+            return queryset.filter(pk__in=recipe_ids)
+        return queryset.exclude(pk__in=recipe_ids)
+
+    @staticmethod
+    def filter_tags(queryset, name, value):
+        """Рецепты хотя бы с одним из тегов, без JOIN и DISTINCT."""
+        tag_map = get_tag_map()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=[tag_map[slug] for slug in value]
+            )
+        ))
+
+    @staticmethod
+    def filter_search(queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию и ингредиентам."""
+        return search_recipes(queryset, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов, ?ordering=popular — по таблице рейтинга.
+
+    При поиске без явной сортировки рецепты идут по релевантности.
+    """
+
+    aliases = {
+        'popular': (F('popularity__score').desc(nulls_last=True),
+                    '-created_at', '-id'),
+    }
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = set(super().remove_invalid_fields(
+            queryset, fields, view, request))
+        return self.expand_aliases(
+            term for term in fields if term in valid or term in self.aliases)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ('search_rank' in queryset.query.annotations
+                and not request.query_params.get(self.ordering_param)):
+            return ['-search_rank', *(ordering or [])]
+        return ordering
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        return self.expand_aliases(ordering) if ordering else ordering
+
+    def expand_aliases(self, ordering):
+        expanded = []
+        for term in ordering:
+            expanded.extend(self.aliases.get(term, (term,)))
+        return expanded
 
 
 class IngredientFilter(filters.FilterSet):
     """Фильтрация модели Ингредиенты."""
 
-    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    @staticmethod
+    def filter_name(queryset, name, value):
+        """Автодополнение: сначала совпадения по началу, затем по вхождению.
+
+        Поиск идёт по lower(name), для которого в PostgreSQL есть индексы
+        text_pattern_ops (по началу) и pg_trgm (по вхождению). Короткие
+        запросы ищутся только по началу названия.
+        """
+        value = value.lower()
+        queryset = queryset.annotate(name_lower=Lower('name'))
+        if len(value) < INGREDIENT_SUBSTRING_MIN_LENGTH:
+            return queryset.filter(
+                name_lower__startswith=value).order_by('name_lower', 'pk')
+        return queryset.filter(name_lower__contains=value).annotate(
+            match_rank=Case(
+                When(name_lower__startswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('match_rank', 'name_lower', 'pk')
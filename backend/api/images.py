@@ -0,0 +1,198 @@
+import logging
+import os
+from io import BytesIO
+
+from constants import (AVATAR_IMAGE_VARIANTS, IMAGE_MAX_SIDE, IMAGE_QUALITY,
+                       IMAGE_VARIANT_ATTEMPTS, IMAGE_VARIANT_FORMATS,
+                       RECIPE_IMAGE_VARIANTS)
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+BATCH_SIZE = 100
+EXTENSIONS = {'jpeg': 'jpg'}
+# Ключ, под которым вместо копий хранится число неудачных попыток.
+FAILED_ATTEMPTS = 'failed_attempts'
+
+# Модель: (поле с исходником, поле с копиями, размеры копий).
+IMAGE_FIELDS = {
+    Recipe: ('image', 'image_variants', RECIPE_IMAGE_VARIANTS),
+    User: ('avatar', 'avatar_variants', AVATAR_IMAGE_VARIANTS),
+}
+
+
+def cap_image(file):
+    """Уменьшить изображение до IMAGE_MAX_SIDE по большей стороне.
+
+    Небольшие и анимированные изображения возвращаются без изменений.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        if (max(image.size) <= IMAGE_MAX_SIDE
+                or getattr(image, 'is_animated', False)):
+            file.seek(0)
+            return file
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, quality=IMAGE_QUALITY)
+    return ContentFile(buffer.getvalue(), name=file.name)
+
+
+def _has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info)
+
+
+def _flatten(image, image_format):
+    """JPEG не хранит прозрачность: подложить под копию белый фон."""
+    if image_format != 'jpeg' or image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_variants(field_file, sizes):
+    """Сохранить уменьшенные копии изображения во всех форматах.
+
+    Возвращает пути в хранилище: {имя копии: {формат: путь}}.
+    """
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+    folder = os.path.join(os.path.dirname(field_file.name), 'variants')
+    with field_file.open('rb'), Image.open(field_file) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    variants = {}
+    for name, size in sizes.items():
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        paths = {}
+        for image_format in IMAGE_VARIANT_FORMATS:
+            buffer = BytesIO()
+            _flatten(variant, image_format).save(
+                buffer, format=image_format, quality=IMAGE_QUALITY)
+            extension = EXTENSIONS.get(image_format, image_format)
+            paths[image_format] = default_storage.save(
+                f'{folder}/{stem}_{name}.{extension}',
+                ContentFile(buffer.getvalue()))
+        variants[name] = paths
+    return variants
+
+
+def is_built(variants):
+    """Построены ли копии: не ожидают сборки и не упали при ней."""
+    return bool(variants) and FAILED_ATTEMPTS not in variants
+
+
+def delete_variant_files(variants):
+    """Удалить файлы копий после фиксации транзакции."""
+    if not is_built(variants):
+        return
+    paths = [path for formats in variants.values()
+             for path in formats.values()]
+
+    def delete():
+        for path in paths:
+            default_storage.delete(path)
+
+    transaction.on_commit(delete)
+
+
+def discard_variants(instance):
+    """Пометить копии объекта устаревшими перед заменой изображения.
+
+    Пути старых копий читаются из базы: объект может быть копией
+    пользователя из кэша токенов.
+    """
+    model = type(instance)
+    _, variants_field, _ = IMAGE_FIELDS[model]
+    delete_variant_files(model.objects.filter(pk=instance.pk).values_list(
+        variants_field, flat=True).first())
+    setattr(instance, variants_field, None)
+
+
+def build_variants(model, pk):
+    """Построить копии изображения объекта и записать их пути.
+
+    Если построить копии не удалось, записывается число попыток:
+    воркер повторяет сборку, пока их меньше IMAGE_VARIANT_ATTEMPTS.
+    Возвращает False, если объект удалён, его изображение сменилось
+    или копии уже построены другим процессом.
+    """
+    source_field, variants_field, sizes = IMAGE_FIELDS[model]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return False
+    source = getattr(instance, source_field)
+    variants = {}
+    if source:
+        try:
+            variants = render_variants(source, sizes)
+        except Exception:
+            logger.exception('Image variants for %s %s failed',
+                             model.__name__, pk)
+            previous = getattr(instance, variants_field) or {}
+            variants = {
+                FAILED_ATTEMPTS: previous.get(FAILED_ATTEMPTS, 0) + 1}
+    with transaction.atomic():
+        instance = (model.objects
+                    .select_for_update()
+                    .filter(pk=pk, **{source_field: source.name})
+                    .first())
+        if instance is None or is_built(getattr(instance, variants_field)):
+            delete_variant_files(variants)
+            return False
+        setattr(instance, variants_field, variants)
+        # save(), а не update(): сигналы сбросят кэш ответов и токенов.
+        instance.save(update_fields=[variants_field])
+    return is_built(variants)
+
+
+def pending_images(model):
+    """Объекты с изображением, для которого ещё нет копий.
+
+    Сюда же попадают изображения, сборка которых упала меньше
+    IMAGE_VARIANT_ATTEMPTS раз.
+    """
+    source_field, variants_field, _ = IMAGE_FIELDS[model]
+    return (model.objects
+            .filter(Q(**{f'{variants_field}__isnull': True})
+                    | Q(**{f'{variants_field}__{FAILED_ATTEMPTS}__lt':
+                           IMAGE_VARIANT_ATTEMPTS}))
+            .exclude(**{f'{source_field}__isnull': True})
+            .exclude(**{source_field: ''}))
+
+
+def process_pending_images(limit=BATCH_SIZE):
+    """Построить копии для ожидающих изображений, вернуть их число."""
+    processed = 0
+    for model in IMAGE_FIELDS:
+        pks = pending_images(model).order_by('pk').values_list(
+            'pk', flat=True)[:limit - processed]
+        for pk in list(pks):
+            processed += build_variants(model, pk)
+        if processed >= limit:
+            break
+    return processed
+
+
+def schedule_variants(instance):
+    """Построить копии после фиксации транзакции или оставить воркеру.
+
+    При IMAGE_VARIANTS_ASYNC копии строит process_image_variants.
+    """
+    if settings.IMAGE_VARIANTS_ASYNC:
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: build_variants(model, pk))
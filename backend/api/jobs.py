@@ -0,0 +1,95 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from constants import EXPORT_JOB_ATTEMPTS
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from recipes.models import ShoppingListExport
+
+from .exports import iter_ingredient_rows, render_to_file
+
+logger = logging.getLogger(__name__)
+
+STALE_JOB_ERROR = 'Worker stopped before the export finished'
+
+
+def claim_next_job():
+    """Взять из очереди самое старое задание и отметить его как начатое.
+
+    Строка блокируется с SKIP LOCKED, поэтому несколько воркеров
+    не получат одно и то же задание.
+    """
+    with transaction.atomic():
+        job = (ShoppingListExport.objects
+               .select_for_update(skip_locked=True)
+               .filter(status=ShoppingListExport.PENDING)
+               .order_by('created_at', 'pk')
+               .first())
+        if job is None:
+            return None
+        job.status = ShoppingListExport.RUNNING
+        job.claimed_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'claimed_at', 'attempts'])
+    return job
+
+
+def requeue_stale_jobs():
+    """Вернуть в очередь задания, брошенные остановленным воркером.
+
+    Задание считается брошенным, если оно выполняется дольше
+    EXPORT_JOB_TIMEOUT. После EXPORT_JOB_ATTEMPTS попыток оно
+    помечается ошибкой. Возвращает число возвращённых заданий.
+    """
+    stale = ShoppingListExport.objects.filter(
+        Q(claimed_at__lt=timezone.now() - timedelta(
+            seconds=settings.EXPORT_JOB_TIMEOUT))
+        | Q(claimed_at__isnull=True),
+        status=ShoppingListExport.RUNNING)
+    stale.filter(attempts__gte=EXPORT_JOB_ATTEMPTS).update(
+        status=ShoppingListExport.FAILED, error=STALE_JOB_ERROR,
+        finished_at=timezone.now())
+    return stale.update(status=ShoppingListExport.PENDING)
+
+
+def run_job(job):
+    """Отрисовать файл задания и сохранить его в хранилище media."""
+    try:
+        with render_to_file(
+                job.file_format, iter_ingredient_rows(job.user)) as output:
+            job.file.save(f'{uuid.uuid4().hex}.{job.file_format}',
+                          File(output), save=False)
+        job.status = ShoppingListExport.DONE
+    except Exception as error:
+        logger.exception('Shopping list export %s failed', job.pk)
+        job.status = ShoppingListExport.FAILED
+        job.error = str(error)
+    job.finished_at = timezone.now()
+    # Если задание уже вернули в очередь, результат пишет другой воркер.
+    finished = ShoppingListExport.objects.filter(
+        pk=job.pk, status=ShoppingListExport.RUNNING,
+        claimed_at=job.claimed_at,
+    ).update(file=job.file.name, status=job.status, error=job.error,
+             finished_at=job.finished_at)
+    if not finished and job.file:
+        job.file.delete(save=False)
+    return job
+
+
+def process_jobs(limit=None):
+    """Выполнить задания из очереди, вернуть число выполненных."""
+    requeued = requeue_stale_jobs()
+    if requeued:
+        logger.warning('Requeued %s stale shopping list export(s)', requeued)
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
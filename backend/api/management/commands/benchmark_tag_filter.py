@@ -0,0 +1,97 @@
+import random
+import time
+
+from api.cache import TAGS_VERSION, bump_version
+from api.filters import RecipeFilter
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django_filters import rest_framework as filters
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+PAGE_SIZE = 10
+
+
+class LegacyRecipeFilter(filters.FilterSet):
+    """Прежний фильтр по тегам: DISTINCT по slug и JOIN по тегам."""
+
+    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+
+    class Meta:
+        model = Recipe
+        fields = ['tags']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Сравнить прежний и текущий фильтр рецептов по тегам."""
+
+    help = ('Seed recipes in a rolled back transaction and compare '
+            'the legacy and the Exists-based tag filters')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20_000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                slugs = self.seed(kwargs)
+                query = QueryDict(mutable=True)
+                query.setlist('tags', random.sample(slugs, 3))
+                for filterset_class in (LegacyRecipeFilter, RecipeFilter):
+                    self.measure(filterset_class, query, kwargs['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            bump_version(TAGS_VERSION)
+
+    def seed(self, options):
+        author = User.objects.create(
+            username='benchmark', email='benchmark@example.com')
+        Tag.objects.bulk_create(
+            Tag(name=f'benchmark {number}', slug=f'benchmark-{number}')
+            for number in range(options['tags']))
+        tags = list(Tag.objects.filter(slug__startswith='benchmark-'))
+        Recipe.objects.bulk_create(
+            (Recipe(author=author, name=f'Recipe {number}',
+                    image='recipes/benchmark.png', description='',
+                    cooking_time=1)
+             for number in range(options['recipes'])),
+            batch_size=1000)
+        recipes = Recipe.objects.filter(author=author).values_list(
+            'pk', flat=True)
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.pk)
+             for recipe_id in recipes
+             for tag in random.sample(tags, options['tags_per_recipe'])),
+            batch_size=1000)
+        bump_version(TAGS_VERSION)
+        return [tag.slug for tag in tags]
+
+    def measure(self, filterset_class, query, repeat):
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(repeat):
+                filterset = filterset_class(
+                    query, queryset=Recipe.objects.all())
+                if not filterset.is_valid():
+                    raise CommandError(filterset.errors)
+                queryset = filterset.qs
+                total = queryset.count()
+                list(queryset[:PAGE_SIZE])
+        elapsed = (time.perf_counter() - started) / repeat
+        self.stdout.write(
+            f'{filterset_class.__name__}: {elapsed * 1000:.1f} ms, '
+            f'{len(context.captured_queries) // repeat} queries per '
+            f'request, {total} recipes')
@@ -0,0 +1,35 @@
+import time
+
+from api.images import process_pending_images
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+POLL_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    """Воркер уменьшенных копий изображений рецептов и аватаров."""
+
+    help = 'Render pending recipe image and avatar variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process pending images once and exit')
+        parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                            help='Seconds to wait when nothing is pending')
+
+    def handle(self, *args, **kwargs):
+        # Без IMAGE_VARIANTS_ASYNC копии строит и процесс API: воркер
+        # собирал бы те же изображения одновременно с ним.
+        if not settings.IMAGE_VARIANTS_ASYNC and not kwargs['once']:
+            raise CommandError(
+                'IMAGE_VARIANTS_ASYNC is off, variants are built inline; '
+                'use --once to build pending variants')
+        while True:
+            processed = process_pending_images()
+            if processed:
+                self.stdout.write(f'Processed {processed} image(s)')
+            if kwargs['once']:
+                break
+            if not processed:
+                time.sleep(kwargs['interval'])
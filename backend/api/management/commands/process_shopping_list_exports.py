@@ -0,0 +1,27 @@
+import time
+
+from api.jobs import process_jobs
+from django.core.management.base import BaseCommand
+
+POLL_INTERVAL = 2
+
+
+class Command(BaseCommand):
+    """Воркер очереди выгрузок списка покупок."""
+
+    help = 'Render queued shopping list exports into media storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the queue once and exit')
+        parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                            help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            processed = process_jobs()
+            if processed:
+                self.stdout.write(f'Processed {processed} export(s)')
+            if kwargs['once']:
+                break
+            time.sleep(kwargs['interval'])
@@ -0,0 +1,23 @@
+import time
+
+from api.feed import trim_feeds
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Обрезать ленты подписок до FEED_LENGTH записей."""
+
+    help = 'Delete feed entries beyond FEED_LENGTH newest recipes per user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, trimming every N seconds')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            deleted = trim_feeds()
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deleted} feed entries'))
+            if kwargs['interval'] is None:
+                break
+            time.sleep(kwargs['interval'])
@@ -1,66 +1,100 @@
-import io
 import os
+import tempfile
 
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+from reportlab.pdfgen import canvas
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 font_path = os.path.join(current_dir, 'fonts', 'dejavusans.ttf')
 
-pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
+FONT_NAME = 'DejaVuSans'
+pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 72
+SPOOL_MAX_SIZE = 1024 * 1024
+
+TITLE_STYLE = ParagraphStyle(
+    'ShoppingListTitle',
+    fontName=FONT_NAME,
+    fontSize=24,
+    leading=29,
+    textColor=colors.black,
+    alignment=TA_CENTER,
+    spaceAfter=20
+)
+LINE_STYLE = ParagraphStyle(
+    'ShoppingListLine',
+    fontName=FONT_NAME,
+    fontSize=12,
+    leading=14.4,
+    textColor=colors.black
+)
+FOOTER_STYLE = ParagraphStyle(
+    'ShoppingListFooter',
+    fontName=FONT_NAME,
+    fontSize=10,
+    leading=12,
+    textColor=colors.gray,
+    alignment=TA_CENTER,
+    spaceBefore=20
+)
+
+
+class _PageWriter:
+    """Построчный вывод текста на canvas с переносом страниц."""
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def write(self, text, style):
+        self.pdf.setFont(style.fontName, style.fontSize)
+        self.pdf.setFillColor(style.textColor)
+        width = PAGE_WIDTH - 2 * MARGIN
+        for line in simpleSplit(text, style.fontName, style.fontSize, width):
+            if self.y - style.leading < MARGIN:
+                self.pdf.showPage()
+                self.pdf.setFont(style.fontName, style.fontSize)
+                self.pdf.setFillColor(style.textColor)
+                self.y = PAGE_HEIGHT - MARGIN
+            self.y -= style.leading
+            if style.alignment == TA_CENTER:
+                self.pdf.drawCentredString(PAGE_WIDTH / 2, self.y, line)
+            else:
+                self.pdf.drawString(MARGIN, self.y, line)
+
+    def skip(self, height):
+        self.y -= height
 
 
 def create_pdf(ingredients):
-    """Создать pdf file."""
-    pdf_buffer = io.BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Title'],
-        fontName='DejaVuSans',
-        fontSize=24,
-        textColor=colors.black,
-        alignment=1,
-        spaceAfter=20
-    )
-    title = Paragraph("Список покупок", title_style)
-
-    normal_dejavusans_style = ParagraphStyle(
-        'NormalDejaVuSans',
-        parent=styles['Normal'],
-        fontName='DejaVuSans',
-        fontSize=12,
-        textColor=colors.black
-    )
-
-    ingredients_list = []
+    """Создать pdf file.
+
+    Строки рисуются прямо на canvas, без flowable-объектов platypus,
+    а документ пишется во временный файл, который при большом размере
+    уходит на диск.
+    """
+    pdf_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    pdf = canvas.Canvas(pdf_file, pagesize=letter)
+    writer = _PageWriter(pdf)
+
+    writer.write('Список покупок', TITLE_STYLE)
+    writer.skip(TITLE_STYLE.spaceAfter)
     for ingredient in ingredients:
-        line = (f"{ingredient['name']} - "
-                f"{ingredient['measurement_unit']} - "
-                f"{ingredient['total_amount']}")
-        ingredients_list.append(Paragraph(line, normal_dejavusans_style))
-
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontName='DejaVuSans',
-        fontSize=10,
-        textColor=colors.gray,
-        alignment=1,
-        spaceBefore=20
-    )
-    footer = Paragraph('ООО "Foodgram Corporation" 2024г', footer_style)
-
-    elements = ([title, Spacer(1, 12)]
-                + ingredients_list + [Spacer(1, 20), footer])
-
-    doc.build(elements)
-    pdf_buffer.seek(0)
-
-    return pdf_buffer
+        writer.write(f"{ingredient['name']} - "
+                     f"{ingredient['measurement_unit']} - "
+                     f"{ingredient['total_amount']}", LINE_STYLE)
+    writer.skip(FOOTER_STYLE.spaceBefore)
+    writer.write('ООО "Foodgram Corporation" 2024г', FOOTER_STYLE)
+
+    pdf.save()
+    pdf_file.seek(0)
+
+    return pdf_file
@@ -0,0 +1,50 @@
+from rest_framework import exceptions, renderers
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """Формат выгрузки списка покупок.
+
+    Сам файл отдаёт представление, через рендерер отдаются только ошибки,
+    и они сериализуются в JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return renderers.JSONRenderer().render(data)
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """Формат выгрузки по ?format= или Accept, иначе первый рендерер.
+
+    Клиенты, присылающие Accept: application/json, получают PDF,
+    а не 406. Неизвестный ?format= по-прежнему отвечает 404.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except exceptions.NotAcceptable:
+            format_query_param = self.settings.URL_FORMAT_OVERRIDE
+            file_format = format_suffix or request.query_params.get(
+                format_query_param)
+            if file_format:
+                renderers = self.filter_renderers(renderers, file_format)
+            return renderers[0], renderers[0].media_type
@@ -1,11 +1,19 @@
+from constants import (BULK_RECIPES_MAX, COOK_RESULTS_LIMIT,
+                       COOK_RESULTS_MAX_LIMIT)
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListExport, Tag)
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from users.models import Follow
 
+from .coverage import record_recipe_ingredients
+from .feed import fan_out_recipe
+from .fields import (BulkPrimaryKeyRelatedField, BulkRelatedListSerializer,
+                     CappedBase64ImageField, ImageVariantsField)
+from .images import discard_variants, schedule_variants
+
 User = get_user_model()
 
 
@@ -23,29 +31,36 @@ class UserRecipeSerializerData(serializers.ModelSerializer):
 class AvatarSerialize(serializers.ModelSerializer):
     """Сериализатор для аватара."""
 
-    avatar = Base64ImageField(required=True)
+    avatar = CappedBase64ImageField(required=True)
 
     class Meta:
         model = User
         fields = ('avatar',)
 
+    def update(self, instance, validated_data):
+        discard_variants(instance)
+        instance = super().update(instance, validated_data)
+        schedule_variants(instance)
+        return instance
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор пользователя."""
 
     is_subscribed = serializers.BooleanField(default=False)
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'avatar')
+                  'is_subscribed', 'avatar', 'avatar_variants')
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
     """Сериализатор пользователей с полями 'recipes', 'recipes_count'."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
     is_subscribed = serializers.BooleanField(default=False)
 
     class Meta:
@@ -53,21 +68,19 @@ class CustomUserSerializer(serializers.ModelSerializer):
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count', 'avatar')
 
-    @staticmethod
-    def get_recipes_count(obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit', None)
-        recipes = obj.recipes.all()
-
-        if recipes_limit:
-            try:
-                recipes_limit = int(recipes_limit)
-                recipes = recipes[:recipes_limit]
-            except ValueError:
-                pass
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            request = self.context.get('request')
+            recipes_limit = request.query_params.get('recipes_limit', None)
+            recipes = obj.recipes.all()
+
+            if recipes_limit:
+                try:
+                    recipes_limit = int(recipes_limit)
+                    recipes = recipes[:recipes_limit]
+                except ValueError:
+                    pass
 
         return UserRecipeSerializerData(recipes, many=True).data
 
@@ -91,11 +104,12 @@ class IngredientSerializer(serializers.ModelSerializer):
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     """Сериализатор модели RecipeIngredient."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = BulkRelatedListSerializer
 
 
 class RecipeIngredientReadSerializer(serializers.ModelSerializer):
@@ -121,20 +135,23 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.BooleanField(default=False)
     is_in_shopping_cart = serializers.BooleanField(default=False)
     text = serializers.CharField(source='description')
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_variants', 'text', 'cooking_time')
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор модели Recipe."""
 
     ingredients = RecipeIngredientCreateSerializer(many=True)
+    tags = BulkPrimaryKeyRelatedField(
+        queryset=Tag.objects.all(), many=True, allow_empty=False)
     text = serializers.CharField(source='description')
-    image = Base64ImageField(required=True)
+    image = CappedBase64ImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -164,6 +181,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
@@ -171,16 +189,26 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._save_ingredients(recipe, ingredients_data)
         recipe.tags.set(tags_data)
+        record_recipe_ingredients(
+            recipe.id, [item['id'].id for item in ingredients_data])
+        fan_out_recipe(recipe)
+        schedule_variants(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
+        if 'image' in validated_data:
+            discard_variants(instance)
         instance = super().update(instance, validated_data)
 
         instance.tags.set(tags_data)
-        instance.ingredients.clear()
-        self._save_ingredients(instance, ingredients_data)
+        if self._update_ingredients(instance, ingredients_data):
+            record_recipe_ingredients(
+                instance.id, [item['id'].id for item in ingredients_data])
+        if 'image' in validated_data:
+            schedule_variants(instance)
 
         return instance
 
@@ -196,6 +224,42 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    @staticmethod
+    def _update_ingredients(recipe, ingredients_data):
+        """Записать только разницу с текущим составом рецепта.
+
+        Новые ингредиенты вставляются, изменённые количества обновляются
+        одним bulk_update, лишние строки удаляются. Возвращает True, если
+        изменился набор ингредиентов.
+        """
+        amounts = {item['id'].id: item['amount'] for item in ingredients_data}
+        existing = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        removed = [row.pk for ingredient_id, row in existing.items()
+                   if ingredient_id not in amounts]
+        changed = []
+        for ingredient_id, row in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        created = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+        return bool(removed or created)
+
     def to_representation(self, instance):
         return RecipeReadSerializer(instance, context=self.context).data
 
@@ -269,3 +333,36 @@ class ShoppingCartSerializer(BaseUserRecipeSerializer):
                 fields=('user', 'recipe')
             )
         ]
+
+
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    """Сериализатор заданий на выгрузку списка покупок."""
+
+    class Meta:
+        model = ShoppingListExport
+        fields = ('id', 'file_format', 'status', 'file', 'error',
+                  'created_at', 'finished_at')
+        read_only_fields = ('status', 'file', 'error',
+                            'created_at', 'finished_at')
+
+
+class CookQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=COOK_RESULTS_MAX_LIMIT,
+        default=COOK_RESULTS_LIMIT)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетного добавления и удаления."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=BULK_RECIPES_MAX)
+
+    @staticmethod
+    def validate_recipes(value):
+        return list(dict.fromkeys(value))
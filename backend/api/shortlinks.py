@@ -0,0 +1,70 @@
+import threading
+
+import short_url
+from django.core.cache import cache
+from recipes.models import Recipe
+
+from .cache import get_version
+
+RECIPE_IDS_VERSION = 'recipe_ids'
+
+_recipe_ids = None
+_recipe_ids_lock = threading.Lock()
+
+
+class RecipeIdBitmap:
+    """Битовая карта id существующих рецептов: бит на каждый id."""
+
+    __slots__ = ('version', 'bits')
+
+    def __init__(self, version, bits):
+        self.version = version
+        self.bits = bits
+
+    @classmethod
+    def build(cls, version, ids):
+        ids = list(ids)
+        bits = bytearray(max(ids, default=0) // 8 + 1)
+        for pk in ids:
+            bits[pk >> 3] |= 1 << (pk & 7)
+        return cls(version, bytes(bits))
+
+    def __contains__(self, pk):
+        byte = pk >> 3
+        return (0 <= byte < len(self.bits)
+                and bool(self.bits[byte] & (1 << (pk & 7))))
+
+
+def get_recipe_ids():
+    """Вернуть карту id рецептов, перечитав её после смены версии.
+
+    Карта хранится в общем кэше, чтобы её строил один процесс, и в
+    памяти каждого процесса.
+    """
+    global _recipe_ids
+    version = get_version(RECIPE_IDS_VERSION)
+    recipe_ids = _recipe_ids
+    if recipe_ids is None or recipe_ids.version != version:
+        with _recipe_ids_lock:
+            recipe_ids = _recipe_ids
+            if recipe_ids is None or recipe_ids.version != version:
+                key = f'recipe_ids:{version}'
+                bits = cache.get(key)
+                if bits is None:
+                    recipe_ids = RecipeIdBitmap.build(
+                        version, Recipe.objects.values_list(
+                            'pk', flat=True).iterator())
+                    cache.set(key, recipe_ids.bits, timeout=None)
+                else:
+                    recipe_ids = RecipeIdBitmap(version, bits)
+                _recipe_ids = recipe_ids
+    return recipe_ids
+
+
+def decode_short_id(short_id):
+    """id рецепта по короткой ссылке или None, если такого рецепта нет."""
+    try:
+        recipe_id = short_url.decode_url(short_id)
+    except ValueError:
+        return None
+    return recipe_id if recipe_id in get_recipe_ids() else None
@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from recipes.counters import update_counter
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.search import sync_search_index, update_search_document
+from rest_framework.authtoken.models import Token
+from users.models import Follow
+
+from .authentication import invalidate_token
+from .cache import (CONTENT_VERSION, TAGS_VERSION, bump_version,
+                    invalidate_user_flags)
+from .catalog import INGREDIENTS_VERSION
+from .coverage import (record_recipe_ingredients, refresh_recipe_ingredients,
+                       reset_coverage_index)
+from .exports import cart_version_name
+from .images import IMAGE_FIELDS, delete_variant_files
+from .shortlinks import RECIPE_IDS_VERSION
+
+User = get_user_model()
+
+# Модель строки: (модель со счётчиком, поле связи, счётчик).
+COUNTED_MODELS = {
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Favorite: (Recipe, 'recipe_id', Favorite.recipe_counter),
+    ShoppingCart: (Recipe, 'recipe_id', ShoppingCart.recipe_counter),
+    Follow: (User, 'following_id', 'followers_count'),
+}
+
+
+def on_commit_once(key, func, using=None):
+    """transaction.on_commit, пропускающий уже запланированный ключ."""
+    connection = transaction.get_connection(using)
+    if any(getattr(entry[1], 'commit_key', None) == key
+           and entry[1].pending for entry in connection.run_on_commit):
+        return
+
+    def callback():
+        callback.pending = False
+        func()
+
+    callback.commit_key, callback.pending = key, True
+    transaction.on_commit(callback, using)
+
+
+def bump_content_version(**kwargs):
+    """Сбросить закэшированные ответы после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_version(CONTENT_VERSION))
+
+
+def bump_content_version_on_user_save(created=False, update_fields=None,
+                                      **kwargs):
+    """Данные автора входят в ответ, кроме даты последнего входа.
+
+    Новый пользователь ещё не автор ни одного рецепта.
+    """
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    bump_content_version()
+
+
+def bump_tags_version(**kwargs):
+    transaction.on_commit(lambda: bump_version(TAGS_VERSION))
+
+
+def bump_ingredients_version(**kwargs):
+    transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
+
+
+def bump_recipe_ids_version(created=True, **kwargs):
+    """Набор id рецептов меняется только при создании и удалении."""
+    if created:
+        transaction.on_commit(lambda: bump_version(RECIPE_IDS_VERSION))
+
+
+def invalidate_owner_flags(instance, **kwargs):
+    """Сбросить закэшированные флаги владельца записи."""
+    transaction.on_commit(lambda: invalidate_user_flags(instance.user_id))
+
+
+def bump_cart_version(instance, **kwargs):
+    """Список покупок владельца корзины нужно пересчитать."""
+    transaction.on_commit(
+        lambda: bump_version(cart_version_name(instance.user_id)))
+
+
+def schedule_search_document(recipe_id, using):
+    on_commit_once(
+        ('search_document', recipe_id),
+        lambda: update_search_document(recipe_id, using=using), using)
+
+
+def index_recipe(instance, using, **kwargs):
+    """Пересобрать поисковый документ после фиксации транзакции."""
+    schedule_search_document(instance.pk, using)
+
+
+def index_recipe_ingredients(instance, using, **kwargs):
+    """Состав рецепта, изменённый в том числе из админки."""
+    recipe_id = instance.recipe_id
+    schedule_search_document(recipe_id, using)
+    on_commit_once(
+        ('recipe_ingredients', recipe_id),
+        lambda: refresh_recipe_ingredients(recipe_id), using)
+
+
+def unindex_recipe(instance, using, **kwargs):
+    sync_search_index(instance.pk, using=using)
+    record_recipe_ingredients(instance.pk, ())
+
+
+def reset_recipe_ingredients(**kwargs):
+    """Удаление ингредиента меняет состав рецептов каскадно."""
+    reset_coverage_index()
+
+
+def delete_image_variants(sender, instance, **kwargs):
+    """Файлы копий изображения удалённого рецепта или пользователя."""
+    _, variants_field, _ = IMAGE_FIELDS[sender]
+    delete_variant_files(getattr(instance, variants_field))
+
+
+def increment_counter(sender, instance, created=False, raw=False,
+                      **kwargs):
+    """Новая строка, в том числе созданная из админки."""
+    if created and not raw:
+        model, field, counter = COUNTED_MODELS[sender]
+        update_counter(model, getattr(instance, field), counter, 1)
+
+
+def decrement_counter(sender, instance, **kwargs):
+    """Удалённая строка, в том числе каскадно вместе с владельцем."""
+    model, field, counter = COUNTED_MODELS[sender]
+    update_counter(model, getattr(instance, field), counter, -1)
+
+
+def invalidate_token_cache(instance, **kwargs):
+    """Удалённый при выходе токен нельзя принимать из кэша."""
+    transaction.on_commit(lambda: invalidate_token(instance.key))
+
+
+def invalidate_user_tokens(instance, update_fields=None, **kwargs):
+    """Пароль, активность и профиль пользователя в кэше устарели."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    keys = list(Token.objects.filter(
+        user_id=instance.pk).values_list('key', flat=True))
+
+    def invalidate():
+        for key in keys:
+            invalidate_token(key)
+
+    transaction.on_commit(invalidate)
+
+
+for model in (Recipe, RecipeIngredient, Tag, Ingredient):
+    post_save.connect(bump_content_version, sender=model)
+    post_delete.connect(bump_content_version, sender=model)
+
+post_save.connect(index_recipe, sender=Recipe)
+post_delete.connect(unindex_recipe, sender=Recipe)
+post_save.connect(index_recipe_ingredients, sender=RecipeIngredient)
+post_delete.connect(index_recipe_ingredients, sender=RecipeIngredient)
+post_delete.connect(reset_recipe_ingredients, sender=Ingredient)
+post_delete.connect(delete_image_variants, sender=Recipe)
+post_delete.connect(delete_image_variants, sender=User)
+
+m2m_changed.connect(bump_content_version, sender=Recipe.tags.through)
+m2m_changed.connect(bump_content_version, sender=Recipe.ingredients.through)
+
+post_save.connect(bump_content_version_on_user_save, sender=User)
+post_save.connect(invalidate_user_tokens, sender=User)
+post_delete.connect(invalidate_token_cache, sender=Token)
+post_delete.connect(bump_content_version, sender=User)
+
+for model in (Favorite, ShoppingCart, Follow):
+    post_save.connect(invalidate_owner_flags, sender=model)
+    post_delete.connect(invalidate_owner_flags, sender=model)
+
+for model in COUNTED_MODELS:
+    post_save.connect(increment_counter, sender=model)
+    post_delete.connect(decrement_counter, sender=model)
+
+for signal in (post_save, post_delete):
+    signal.connect(bump_cart_version, sender=ShoppingCart)
+    signal.connect(bump_tags_version, sender=Tag)
+    signal.connect(bump_ingredients_version, sender=Ingredient)
+    signal.connect(bump_recipe_ids_version, sender=Recipe)
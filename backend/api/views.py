@@ -1,27 +1,54 @@
 import short_url
+from constants import INGREDIENT_SEARCH_LIMIT
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import (BooleanField, Exists, OuterRef, Prefetch, Sum,
-                              Value)
-from django.http import FileResponse
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, connection, transaction
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from djoser.views import UserViewSet as BaseUserViewSet
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from rest_framework import filters, permissions, status, viewsets
+from recipes.counters import update_counters
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListExport, Tag)
+from rest_framework import permissions, serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import (LimitOffsetPagination,
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (CursorPagination, LimitOffsetPagination,
                                        PageNumberPagination)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.validators import UniqueTogetherValidator
 from users.models import Follow
 
-from .filters import IngredientFilter, RecipeFilter
-from .pdf_utils import create_pdf
+from .cache import (CONTENT_VERSION, POPULARITY_VERSION, TAGS_VERSION,
+                    bump_version, get_etag, get_or_set_response_data,
+                    get_user_flags, invalidate_user_flags, overlay_user_flags)
+from .catalog import INGREDIENTS_VERSION, get_ingredient_catalog
+from .coverage import get_coverage_index
+from .exports import (EXPORT_FORMATS, cart_version_name, get_cart_state,
+                      iter_ingredient_rows, iter_shopping_list)
+from .feed import (backfill_feed, decode_feed_cursor, encode_feed_cursor,
+                   read_feed, remove_from_feed)
+from .filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from .images import discard_variants
 from .permissions import IsOwnerOrAdmin
-from .serializers import (AvatarSerialize, CustomUserSerializer,
-                          FavoriteSerializer, FollowSerializer,
-                          IngredientSerializer, RecipeCreateSerializer,
+from .renderers import (CSVRenderer, PDFRenderer, PlainTextRenderer,
+                        ShoppingListNegotiation)
+from .serializers import (AvatarSerialize, CookQuerySerializer,
+                          CustomUserSerializer, FavoriteSerializer,
+                          FollowSerializer, IngredientSerializer,
+                          RecipeCreateSerializer, RecipeIdsSerializer,
                           RecipeReadSerializer, ShoppingCartSerializer,
-                          TagSerializer, UserSerializer)
+                          ShoppingListExportSerializer, TagSerializer,
+                          UserSerializer)
+from .shortlinks import decode_short_id, get_recipe_ids
 
 User = get_user_model()
 
@@ -65,6 +92,7 @@ class UserViewSet(BaseUserViewSet):
     @upload_avatar.mapping.delete
     def delete_avatar(self, request):
         user = request.user
+        discard_variants(user)
         user.avatar.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -75,44 +103,111 @@ class UserViewSet(BaseUserViewSet):
         subscriptions = (
             User.objects
             .filter(follower__user=request.user)
-            .annotate(is_subscribed=Value(True, output_field=BooleanField())))
+            .annotate(is_subscribed=Value(True, output_field=BooleanField()))
+            .prefetch_related(self.get_recipes_prefetch(request)))
         page = self.paginate_queryset(subscriptions)
         serializer = CustomUserSerializer(
             page, many=True, context={'request': request})
         return self.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def get_recipes_prefetch(request):
+        """Загрузить рецепты авторов страницы одним запросом.
+
+        Ограничение recipes_limit применяется внутри коррелированного
+        подзапроса, поэтому из базы приходят только нужные рецепты.
+        """
+        queryset = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            recipes_limit = None
+
+        if recipes_limit is not None:
+            queryset = queryset.filter(pk__in=Subquery(
+                Recipe.objects
+                .filter(author=OuterRef('author'))
+                .values('pk')[:max(recipes_limit, 0)]
+            ))
+        return Prefetch('recipes', queryset=queryset,
+                        to_attr='limited_recipes')
+
     @action(detail=True, methods=['post'],
             permission_classes=[permissions.IsAuthenticated])
     def subscribe(self, request, **kwargs):
-        """Подписаться на пользователя по id."""
-        author_id = kwargs.get('id')
-        author = get_object_or_404(User, pk=author_id)
-        data = {
-            'following': author.id,
-            'user': request.user.id
-        }
-        serializer = FollowSerializer(
-            data=data, context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        """Подписаться на пользователя по id.
+
+        Повторную подписку отсекает уникальное ограничение в базе,
+        а не отдельный запрос на проверку.
+        """
+        author = get_object_or_404(User, pk=kwargs.get('id'))
+        if author == request.user:
+            raise serializers.ValidationError(
+                {'following': [serializers.ValidationError.default_detail]})
+        try:
+            with transaction.atomic():
+                follow = Follow.objects.create(
+                    user=request.user, following=author)
+                backfill_feed(request.user.id, author.id)
+        except IntegrityError:
+            if not User.objects.filter(pk=author.id).exists():
+                raise Http404
+            raise unique_error('user', 'following')
+        serializer = FollowSerializer(follow, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, **kwargs):
         """Отписаться от пользователя по id."""
         author_id = kwargs.get('id')
-        author = get_object_or_404(User, pk=author_id)
-        delete_cnt, _ = Follow.objects.filter(
-            user=request.user, following=author.id).delete()
+        with transaction.atomic():
+            delete_cnt, _ = Follow.objects.filter(
+                user=request.user, following=author_id).delete()
+            if delete_cnt:
+                remove_from_feed(request.user.id, author_id)
 
         if not delete_cnt:
+            get_object_or_404(User, pk=author_id)
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+def unique_error(*fields):
+    """Та же ошибка, что возвращает UniqueTogetherValidator."""
+    message = UniqueTogetherValidator.message.format(
+        field_names=', '.join(fields))
+    return serializers.ValidationError(
+        {api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='unique')
+
+
+class ETagMixin:
+    """Условные GET-запросы: ответ 304, пока не сменилась версия данных."""
+
+    etag_version = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().retrieve, *args, **kwargs)
+
+    def get_conditional_response(self, request, handler, *args, **kwargs):
+        etag = f'"{get_etag(self.etag_version, request)}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class TagViewSet(ETagMixin, viewsets.ReadOnlyModelViewSet):
     """Получение тегов."""
 
     queryset = Tag.objects.all()
@@ -120,9 +215,10 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
 
     pagination_class = None
+    etag_version = TAGS_VERSION
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ETagMixin, viewsets.ReadOnlyModelViewSet):
     """Получение ингредиентов."""
 
     queryset = Ingredient.objects.all()
@@ -131,54 +227,255 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
     permission_classes = [permissions.AllowAny]
+    etag_version = INGREDIENTS_VERSION
+
+    def list(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_CATALOG_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return self.get_conditional_response(request, self.list_catalog)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_CATALOG_ENABLED:
+            return super().retrieve(request, *args, **kwargs)
+        return self.get_conditional_response(
+            request, self.retrieve_catalog, *args, **kwargs)
+
+    @staticmethod
+    def list_catalog(request):
+        """Поиск ингредиентов в каталоге процесса без запросов к базе."""
+        catalog = get_ingredient_catalog()
+        name = request.query_params.get('name')
+        if name:
+            return Response(catalog.search(name, INGREDIENT_SEARCH_LIMIT))
+        return Response(catalog.all())
+
+    @staticmethod
+    def retrieve_catalog(request, pk=None):
+        try:
+            ingredient = get_ingredient_catalog().get(int(pk))
+        except ValueError:
+            ingredient = None
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.request.query_params.get('name'):
+            queryset = queryset[:INGREDIENT_SEARCH_LIMIT]
+        return queryset
 
 
 class UserActionsMixin:
     @staticmethod
     def add_object(request, pk, serializer_class):
+        """Добавить рецепт одной вставкой, дубль отсекает база."""
         recipe = get_object_or_404(Recipe, pk=pk)
-        data = {
-            'recipe': recipe.id,
-            'user': request.user.id
-        }
-        serializer = serializer_class(data=data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        model = serializer_class.Meta.model
+        try:
+            with transaction.atomic():
+                instance = model.objects.create(
+                    user=request.user, recipe=recipe)
+        except IntegrityError:
+            if not Recipe.objects.filter(pk=recipe.id).exists():
+                raise Http404
+            raise unique_error('user', 'recipe')
+        serializer = serializer_class(instance, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def delete_object(request, pk, model):
-        recipe = get_object_or_404(Recipe, pk=pk)
         delete_cnt, _ = model.objects.filter(
-            user=request.user, recipe=recipe.id).delete()
+            user=request.user, recipe=pk).delete()
 
         if not delete_cnt:
+            get_object_or_404(Recipe, pk=pk)
             return Response(status=status.HTTP_400_BAD_REQUEST)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def add_objects(self, request, model):
+        """Добавить набор рецептов одной вставкой."""
+        ids, present = self.get_bulk_state(request, model)
+        missing = [pk for pk in ids if present.get(pk) is False]
+        added = []
+        if missing:
+            with transaction.atomic():
+                added = self.insert_missing(model, request.user, missing)
+                # Вставка идёт мимо post_save, счётчики меняются здесь;
+                # удаление ниже уменьшает их через post_delete.
+                update_counters(Recipe, added, model.recipe_counter, 1)
+                self.invalidate_user_rows(request.user, model)
+        return self.get_bulk_response(ids, present, added, 'added', 'exists')
+
+    @staticmethod
+    def insert_missing(model, user, recipe_ids):
+        """Вставить строки одним запросом, вернуть id вставленных рецептов.
+
+        Строки, которые успел вставить параллельный запрос, пропускаются
+        через ON CONFLICT и не попадают в RETURNING.
+        """
+        quote = connection.ops.quote_name
+        values = ', '.join(['(%s, %s)'] * len(recipe_ids))
+        params = [value for pk in recipe_ids for value in (user.id, pk)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(model._meta.db_table)} '
+                f'(user_id, recipe_id) VALUES {values} '
+                f'ON CONFLICT DO NOTHING RETURNING recipe_id', params)
+            return [pk for pk, in cursor.fetchall()]
+
+    def delete_objects(self, request, model):
+        """Удалить набор рецептов одним запросом."""
+        ids, present = self.get_bulk_state(request, model)
+        removed = [pk for pk in ids if present.get(pk)]
+        if removed:
+            model.objects.filter(
+                user=request.user, recipe_id__in=removed).delete()
+        return self.get_bulk_response(
+            ids, present, removed, 'removed', 'missing')
+
+    @staticmethod
+    def get_bulk_state(request, model):
+        """Проверить рецепты одним запросом.
+
+        Возвращает id из запроса и словарь {id: есть ли рецепт у
+        пользователя} для существующих рецептов.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['recipes']
+        present = dict(
+            Recipe.objects
+            .filter(pk__in=ids)
+            .annotate(present=Exists(model.objects.filter(
+                user=request.user, recipe=OuterRef('pk'))))
+            .values_list('pk', 'present'))
+        return ids, present
+
+    @staticmethod
+    def get_bulk_response(ids, present, changed, changed_status,
+                          unchanged_status):
+        changed = set(changed)
+        return Response([
+            {'id': pk,
+             'status': ('not_found' if pk not in present
+                        else changed_status if pk in changed
+                        else unchanged_status)}
+            for pk in ids
+        ])
+
+    @staticmethod
+    def invalidate_user_rows(user, model):
+        """Кэши сбрасываются явно: bulk_create не отправляет сигналы."""
+        transaction.on_commit(lambda: invalidate_user_flags(user.id))
+        if model is ShoppingCart:
+            transaction.on_commit(
+                lambda: bump_version(cart_version_name(user.id)))
+
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 10
 
 
+class RecipeCursorPagination(CursorPagination):
+    """Постраничный вывод по ключу (created_at, id) без COUNT и OFFSET."""
+
+    page_size_query_param = 'limit'
+    page_size = 10
+    ordering = ('-created_at', '-id')
+
+
 class RecipeViewSet(UserActionsMixin, viewsets.ModelViewSet):
     """Создание и редактирвоание рецептов."""
 
     serializer_class = RecipeCreateSerializer
     permission_classes = [IsOwnerOrAdmin]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RecipeOrderingFilter]
     filterset_class = RecipeFilter
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
     pagination_class = CustomPageNumberPagination
+    shared_payload = False
+
+    @property
+    def paginator(self):
+        """Курсорная пагинация по запросу: ?pagination=cursor или ?cursor=.
+
+        Рейтинг популярности и релевантность поиска не уникальны и
+        не подходят для курсора, такие выборки всегда разбиваются
+        по номерам страниц.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if not self.orders_by_rank() and (
+                    params.get('pagination') == 'cursor'
+                    or params.get(RecipeCursorPagination.cursor_query_param)):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def orders_by_rank(self):
+        return (self.orders_by_popularity()
+                or bool(self.request.query_params.get('search')))
+
+    def orders_by_popularity(self):
+        ordering = self.request.query_params.get(
+            RecipeOrderingFilter.ordering_param, '')
+        return self.action == 'popular' or 'popular' in ordering.split(',')
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'popular', 'feed'):
             return RecipeReadSerializer
         return RecipeCreateSerializer
 
+    def list(self, request, *args, **kwargs):
+        if self.depends_on_user(request):
+            return super().list(request, *args, **kwargs)
+        data = self.get_shared_data(super().list, request, *args, **kwargs)
+        if request.user.is_authenticated:
+            overlay_user_flags(data['results'], get_user_flags(request.user))
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_shared_data(
+            super().retrieve, request, *args, **kwargs)
+        if request.user.is_authenticated:
+            overlay_user_flags([data], get_user_flags(request.user))
+        return Response(data)
+
+    @staticmethod
+    def depends_on_user(request):
+        """Фильтры по избранному и корзине нельзя взять из общего кэша."""
+        return request.user.is_authenticated and any(
+            request.query_params.get(name)
+            for name in ('is_favorited', 'is_in_shopping_cart')
+        )
+
+    def get_shared_data(self, handler, request, *args, **kwargs):
+        """Вернуть общий для всех пользователей ответ из кэша."""
+        def build_response():
+            self.shared_payload = True
+            return handler(request, *args, **kwargs)
+
+        versions = (CONTENT_VERSION,)
+        if self.orders_by_popularity():
+            versions += (POPULARITY_VERSION,)
+        return get_or_set_response_data(
+            'recipes', request, build_response, versions)
+
     def get_queryset(self):
-        user = self.request.user
+        user = AnonymousUser() if self.shared_payload else self.request.user
+        queryset = self.get_read_queryset(user)
+        if self.action in ('list', 'retrieve', 'popular', 'feed'):
+            queryset = self.prefetch_read_relations(queryset)
+        if self.action == 'popular':
+            queryset = queryset.filter(popularity__isnull=False)
+        return queryset
+
+    @staticmethod
+    def get_read_queryset(user):
+        """Вернуть рецепты с флагами текущего пользователя."""
         queryset = Recipe.objects.all()
 
         if user.is_authenticated:
@@ -209,16 +506,109 @@ class RecipeViewSet(UserActionsMixin, viewsets.ModelViewSet):
                 is_favorited=Value(False, output_field=BooleanField()),
                 is_in_shopping_cart=Value(False, output_field=BooleanField()),
                 is_subscribed=Value(False, output_field=BooleanField())
-            )
+            ).select_related('author')
 
         return queryset
 
+    @staticmethod
+    def prefetch_read_relations(queryset):
+        """Загрузить теги и ингредиенты рецептов без N+1 запросов."""
+        return queryset.prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.AllowAny],
+            ordering=['popular'])
+    def popular(self, request):
+        """Популярные рецепты из предрассчитанной таблицы рейтинга."""
+        return self.list(request)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.IsAuthenticated])
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь.
+
+        Страница выбирается по ключу (created_at, recipe_id) из ленты
+        и рецептов авторов в режиме чтения, затем загружаются только
+        рецепты страницы. Вместо номеров страниц — курсор ?cursor=.
+        """
+        pagination = RecipeCursorPagination()
+        limit = pagination.get_page_size(request)
+        after = None
+        cursor = request.query_params.get(pagination.cursor_query_param)
+        if cursor:
+            after = decode_feed_cursor(cursor)
+            if after is None:
+                raise NotFound(pagination.invalid_cursor_message)
+        keys = read_feed(request.user, limit + 1, after,
+                         self.get_feed_filter(request))
+        page = keys[:limit]
+        recipes = self.get_queryset().in_bulk([pk for _, pk in page])
+        serializer = self.get_serializer(
+            [recipes[pk] for _, pk in page if pk in recipes], many=True)
+        next_url = None
+        if len(keys) > limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), pagination.cursor_query_param,
+                encode_feed_cursor(page[-1]))
+        return Response({'next': next_url, 'previous': None,
+                         'results': serializer.data})
+
+    def get_feed_filter(self, request):
+        """Рецепты, отобранные фильтрами запроса, или None без фильтров."""
+        filterset = self.filterset_class(
+            request.query_params, queryset=Recipe.objects.all(),
+            request=request)
+        if not set(request.query_params) & set(filterset.filters):
+            return None
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filterset.qs
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.AllowAny])
+    def cook(self, request):
+        """Что приготовить: рецепты по доле имеющихся ингредиентов.
+
+        Кандидаты и их порядок берутся из инвертированного индекса
+        в памяти процесса, из базы читаются только найденные рецепты.
+        """
+        params = CookQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        top = get_coverage_index().top(
+            params.validated_data['ingredients'],
+            params.validated_data['limit'])
+        recipes = self.prefetch_read_relations(
+            self.get_read_queryset(request.user)
+        ).in_bulk([recipe_id for recipe_id, _, _ in top])
+
+        results = []
+        for recipe_id, matched, total in top:
+            if recipe_id not in recipes:
+                continue
+            data = RecipeReadSerializer(
+                recipes[recipe_id], context={'request': request}).data
+            data['matched_ingredients_count'] = matched
+            data['missing_ingredients_count'] = total - matched
+            results.append(data)
+        return Response(results)
+
     @action(detail=True, methods=['get'], url_path='get-link',
             permission_classes=[permissions.AllowAny])
     def get_link(self, request, pk=None):
         """Получить короткую ссылку на рецепт."""
-        recipe = get_object_or_404(Recipe, pk=pk)
-        short_id = short_url.encode_url(recipe.id)
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if recipe_id not in get_recipe_ids():
+            raise Http404
+        short_id = short_url.encode_url(recipe_id)
         short_link = request.build_absolute_uri(f"/s/{short_id}")
         return Response({"short-link": short_link})
 
@@ -244,19 +634,89 @@ class RecipeViewSet(UserActionsMixin, viewsets.ModelViewSet):
         """Удалить рецепт из корзины."""
         return self.delete_object(request, pk, ShoppingCart)
 
-    @staticmethod
-    def get_ingredients_in_shopping_cart(user):
-        """Вернуть ингредиенты в корзине пользователя."""
-        return (Ingredient.objects
-                .filter(recipe__shopping__user=user)
-                .values('name', 'measurement_unit')
-                .annotate(total_amount=Sum('recipeingredient__amount')))
+    @action(methods=['post'], detail=False, url_path='favorite/bulk',
+            permission_classes=[permissions.IsAuthenticated])
+    def favorite_bulk(self, request):
+        """Добавить в избранное несколько рецептов: {"recipes": [id, ...]}."""
+        return self.add_objects(request, Favorite)
 
-    @action(detail=False, methods=['get'],
+    @favorite_bulk.mapping.delete
+    def delete_favorite_bulk(self, request):
+        """Удалить из избранного несколько рецептов."""
+        return self.delete_objects(request, Favorite)
+
+    @action(methods=['post'], detail=False, url_path='shopping_cart/bulk',
             permission_classes=[permissions.IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        """Добавить в корзину несколько рецептов: {"recipes": [id, ...]}."""
+        return self.add_objects(request, ShoppingCart)
+
+    @shopping_cart_bulk.mapping.delete
+    def delete_shopping_cart_bulk(self, request):
+        """Удалить из корзины несколько рецептов."""
+        return self.delete_objects(request, ShoppingCart)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.IsAuthenticated],
+            renderer_classes=[PDFRenderer, PlainTextRenderer, CSVRenderer],
+            content_negotiation_class=ShoppingListNegotiation)
     def download_shopping_cart(self, request):
-        """Скачать pdf файл всех ингредиентов из корзины пользователя."""
-        user = request.user
-        pdf_file = create_pdf(self.get_ingredients_in_shopping_cart(user))
-        return FileResponse(pdf_file, as_attachment=True,
-                            filename='shopping_cart.pdf')
+        """Скачать ингредиенты из корзины пользователя (pdf, txt, csv).
+
+        Формат выбирается параметром format или заголовком Accept,
+        по умолчанию и при неподходящем Accept — pdf. Готовый файл
+        кэшируется по дайджесту содержимого корзины, повторная загрузка
+        отвечает 304 по ETag/Last-Modified.
+        """
+        file_format = request.accepted_renderer.format
+        _, content_type = EXPORT_FORMATS[file_format]
+        digest, last_modified, ingredients = get_cart_state(request.user)
+        if ingredients is None:
+            ingredients = iter_ingredient_rows(request.user)
+
+        etag = f'"{digest}-{file_format}"'
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = StreamingHttpResponse(
+                iter_shopping_list(digest, file_format, ingredients),
+                content_type=content_type)
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_cart.{file_format}"')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=False, methods=['post'],
+            url_path='download_shopping_cart/jobs',
+            permission_classes=[permissions.IsAuthenticated])
+    def create_shopping_cart_export(self, request):
+        """Поставить выгрузку списка покупок в очередь."""
+        serializer = ShoppingListExportSerializer(
+            data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'],
+            url_path=r'download_shopping_cart/jobs/(?P<job_id>\d+)',
+            permission_classes=[permissions.IsAuthenticated])
+    def shopping_cart_export(self, request, job_id=None):
+        """Статус выгрузки и ссылка на готовый файл."""
+        job = get_object_or_404(
+            ShoppingListExport, pk=job_id, user=request.user)
+        serializer = ShoppingListExportSerializer(
+            job, context={'request': request})
+        return Response(serializer.data)
+
+
+def short_link_redirect(request, short_id):
+    """Перейти по короткой ссылке на страницу рецепта."""
+    recipe_id = decode_short_id(short_id)
+    if recipe_id is None:
+        raise Http404
+    response = HttpResponseRedirect(f'/recipes/{recipe_id}')
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_CACHE_TIMEOUT)
+    return response
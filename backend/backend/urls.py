@@ -1,3 +1,4 @@
+from api.views import short_link_redirect
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -6,6 +7,7 @@ from django.urls import include, path
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('s/<str:short_id>', short_link_redirect, name='short-link'),
 ]
 
 if settings.DEBUG:
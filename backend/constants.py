@@ -7,3 +7,20 @@ INGREDIENT_AMOUNT_MAX = 32_000
 MIN_TIME_COOKING = 1
 MAX_TIME_COOKING = 32_000
 MAX_LENGTH_USERS = 150
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SUBSTRING_MIN_LENGTH = 3
+MAX_LENGTH_EXPORT_FORMAT = 8
+MAX_LENGTH_EXPORT_STATUS = 16
+EXPORT_JOB_ATTEMPTS = 3
+POPULARITY_FAVORITE_WEIGHT = 2
+POPULARITY_CART_WEIGHT = 1
+POPULARITY_TIME_SCALE = 45_000
+COOK_RESULTS_LIMIT = 10
+COOK_RESULTS_MAX_LIMIT = 50
+BULK_RECIPES_MAX = 100
+IMAGE_MAX_SIDE = 2048
+IMAGE_QUALITY = 85
+RECIPE_IMAGE_VARIANTS = {'card': 480, 'detail': 1200}
+AVATAR_IMAGE_VARIANTS = {'avatar': 160}
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+IMAGE_VARIANT_ATTEMPTS = 3
@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from .models import Ingredient, Recipe, RecipeIngredient, Tag
 
@@ -18,15 +17,10 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ['tags']
     inlines = [RecipeIngredientInline]
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(total_favorites=Count('favorites'))
-        return queryset
-
     def total_favorites(self, obj):
-        return obj.total_favorites
+        return obj.favorites_count
 
-    total_favorites.admin_order_field = 'total_favorites'
+    total_favorites.admin_order_field = 'favorites_count'
     total_favorites.short_description = 'Total Favorites'
 
 
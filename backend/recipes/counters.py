@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'shopping_cart_count', 'recipes.ShoppingCart',
+     'recipe'),
+    (settings.AUTH_USER_MODEL, 'recipes_count', 'recipes.Recipe', 'author'),
+    (settings.AUTH_USER_MODEL, 'followers_count', 'users.Follow',
+     'following'),
+)
+
+
+def update_counter(model, pk, field, delta):
+    """Атомарно изменить счётчик на delta, не опуская его ниже нуля."""
+    return update_counters(model, [pk], field, delta)
+
+
+def update_counters(model, pks, field, delta):
+    """Изменить счётчик у набора строк одним UPDATE."""
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def reconcile_counters(get_model=apps.get_model):
+    """Исправить разошедшиеся с данными счётчики.
+
+    Каждый счётчик пересчитывается одним UPDATE, который затрагивает
+    только строки с неверным значением. Возвращает число исправленных
+    строк по каждому счётчику.
+    """
+    fixed = {}
+    for label, field, related_label, related_field in COUNTERS:
+        model = get_model(label)
+        related_model = get_model(related_label)
+        actual = Coalesce(Subquery(
+            related_model.objects
+            .filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField()
+        ), 0)
+        fixed[f'{model._meta.label}.{field}'] = (
+            model.objects
+            .annotate(actual_count=actual)
+            .exclude(**{field: F('actual_count')})
+            .update(**{field: actual})
+        )
+    return fixed
@@ -1,25 +1,134 @@
+import csv
 import json
+import os
+import re
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from api.cache import bump_version
+from api.catalog import INGREDIENTS_VERSION
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ['name', 'measurement_unit']
+WHITESPACE = re.compile(r'\s*')
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Разобрать JSON-массив поэлементно, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    expected = '['
+
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise CommandError('Unexpected end of JSON file')
+            chunk = file.read(chunk_size)
+            buffer, pos, eof = chunk, 0, not chunk
+            continue
+
+        char = buffer[pos]
+        if expected == '[':
+            if char != '[':
+                raise CommandError('JSON file must contain an array')
+            pos += 1
+            expected = 'value_or_end'
+        elif expected in ('value', 'value_or_end'):
+            if expected == 'value_or_end' and char == ']':
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                if eof:
+                    raise CommandError(f'Invalid JSON: {error}')
+                chunk = file.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            yield item
+            expected = 'separator'
+        else:
+            if char == ']':
+                return
+            if char != ',':
+                raise CommandError(
+                    f'Invalid JSON near: {buffer[pos:pos + 40]!r}')
+            pos += 1
+            expected = 'value'
+
+
+def iter_csv_rows(file):
+    """Прочитать строки CSV вида 'название,единица измерения'."""
+    for line_number, row in enumerate(csv.reader(file), start=1):
+        if not row:
+            continue
+        if line_number == 1 and row == CSV_HEADER:
+            continue
+        if len(row) != 2:
+            raise CommandError(f'Line {line_number}: expected 2 columns')
+        yield dict(zip(CSV_HEADER, row))
+
+
+def iter_ingredients(items):
+    for item in items:
+        try:
+            name = item['name'].strip()
+            measurement_unit = item['measurement_unit'].strip()
+        except (KeyError, TypeError, AttributeError):
+            raise CommandError(f'Invalid ingredient: {item!r}')
+        yield Ingredient(name=name, measurement_unit=measurement_unit)
+
 
 class Command(BaseCommand):
     """Добавить все ингредиенты в базу данных."""
 
-    help = 'Load ingredients from a JSON file'
+    help = 'Load ingredients from a JSON or CSV file'
 
     def add_arguments(self, parser):
         parser.add_argument('file_path', type=str,
-                            help='The file path of the JSON file')
+                            help='The file path of the JSON or CSV file')
+        parser.add_argument('--format', choices=('json', 'csv'),
+                            help='File format, detected by extension '
+                                 'if omitted')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of rows per INSERT')
 
     def handle(self, *args, **kwargs):
         file_path = kwargs['file_path']
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            for item in data:
-                Ingredient.objects.get_or_create(
-                    name=item['name'],
-                    measurement_unit=item['measurement_unit'])
-        self.stdout.write(
-            self.style.SUCCESS('Data successfully loaded'))
+        file_format = kwargs['format'] or os.path.splitext(
+            file_path)[1].lstrip('.').lower()
+        if file_format not in ('json', 'csv'):
+            raise CommandError(f'Unsupported file format: {file_format}')
+        batch_size = kwargs['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.monotonic()
+        total = 0
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            items = (iter_json_array(file) if file_format == 'json'
+                     else iter_csv_rows(file))
+            ingredients = iter_ingredients(items)
+            with transaction.atomic():
+                count_before = Ingredient.objects.count()
+                while True:
+                    batch = list(islice(ingredients, batch_size))
+                    if not batch:
+                        break
+                    Ingredient.objects.bulk_create(
+                        batch, ignore_conflicts=True)
+                    total += len(batch)
+                inserted = Ingredient.objects.count() - count_before
+                if inserted:
+                    transaction.on_commit(
+                        lambda: bump_version(INGREDIENTS_VERSION))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Data successfully loaded: {inserted} inserted, '
+            f'{total - inserted} skipped, '
+            f'{total / elapsed if elapsed else total:.0f} rows/s'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    """Пересобрать поисковые документы рецептов."""
+
+    help = ('Rebuild recipe search documents, e.g. after ingredients '
+            'were renamed in the admin')
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            rebuilt = rebuild_search_documents()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rebuilt} search document(s)'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    """Пересчитать денормализованные счётчики."""
+
+    help = ('Recount favorites, shopping cart, recipe and follower '
+            'counters that drifted from the data')
+
+    def handle(self, *args, **kwargs):
+        for counter, fixed in reconcile_counters().items():
+            self.stdout.write(f'{counter}: {fixed} row(s) fixed')
+        self.stdout.write(self.style.SUCCESS('Counters reconciled'))
@@ -0,0 +1,39 @@
+import time
+
+from api.cache import POPULARITY_VERSION, bump_version
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.popularity import BATCH_SIZE, refresh_popularity
+
+REFRESH_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    """Обновить таблицу популярности рецептов."""
+
+    help = ('Recompute popularity scores of recipes with new favorite or '
+            'shopping cart activity since the last run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute scores of all recipes')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of recipes per UPDATE')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, refreshing every N seconds')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        full = kwargs['full']
+        while True:
+            with transaction.atomic():
+                refreshed = refresh_popularity(full, kwargs['batch_size'])
+                if refreshed:
+                    transaction.on_commit(
+                        lambda: bump_version(POPULARITY_VERSION))
+            self.stdout.write(f'Refreshed {refreshed} recipe score(s)')
+            if kwargs['interval'] is None:
+                break
+            full = False
+            time.sleep(kwargs['interval'])
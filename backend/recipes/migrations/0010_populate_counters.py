@@ -0,0 +1,18 @@
+from django.db import migrations
+from recipes.counters import reconcile_counters
+
+
+def populate_counters(apps, schema_editor):
+    reconcile_counters(apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_counters'),
+        ('users', '0004_myuser_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+from recipes.search import (FTS_TABLE, SEARCH_CONFIG,
+                            rebuild_search_documents)
+
+POSTGRES_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_idx '
+    'ON recipes_recipe USING gin '
+    f"(to_tsvector('{SEARCH_CONFIG}', search_document))",
+]
+SQLITE_INDEXES = [
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+    'USING fts5(search_document)',
+]
+DROP_INDEXES = {
+    'postgresql': ['DROP INDEX IF EXISTS recipes_recipe_search_idx'],
+    'sqlite': [f'DROP TABLE IF EXISTS {FTS_TABLE}'],
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_INDEXES
+    elif vendor == 'sqlite':
+        statements = SQLITE_INDEXES
+    else:
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+    rebuild_search_documents(apps.get_model, schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP_INDEXES.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Уменьшенные копии; пусто, пока они не построены', null=True),
+        ),
+    ]
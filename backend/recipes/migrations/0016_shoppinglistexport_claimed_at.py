@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-17 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistexport',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistexport',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Когда воркер взял задание в работу', null=True),
+        ),
+    ]
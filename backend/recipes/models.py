@@ -1,4 +1,5 @@
 from constants import (INGREDIENT_AMOUNT_MAX, INGREDIENT_AMOUNT_MIN,
+                       MAX_LENGTH_EXPORT_FORMAT, MAX_LENGTH_EXPORT_STATUS,
                        MAX_LENGTH_INGREDIENT_MEASUREMENT_UNIT,
                        MAX_LENGTH_INGREDIENT_NAME, MAX_LENGTH_RECIPE_NAME,
                        MAX_LENGTH_TAG, MAX_TIME_COOKING, MIN_TIME_COOKING)
@@ -26,6 +27,8 @@ class BaseModelShoppingCartFavorite(models.Model):
 class ShoppingCart(BaseModelShoppingCartFavorite):
     """Модель корзины пользователя."""
 
+    recipe_counter = 'shopping_cart_count'
+
     class Meta(BaseModelShoppingCartFavorite.Meta):
         default_related_name = 'shopping'
         constraints = [
@@ -39,6 +42,8 @@ class ShoppingCart(BaseModelShoppingCartFavorite):
 class Favorite(BaseModelShoppingCartFavorite):
     """Связь пользователя и рецептов для избранного."""
 
+    recipe_counter = 'favorites_count'
+
     class Meta(BaseModelShoppingCartFavorite.Meta):
         default_related_name = 'favorites'
 
@@ -101,14 +106,75 @@ class Recipe(models.Model):
         ]
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(default=0, editable=False)
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0, editable=False)
+    search_document = models.TextField(blank=True, editable=False)
+    image_variants = models.JSONField(
+        null=True, blank=True, editable=False,
+        help_text="Уменьшенные копии; пусто, пока они не построены")
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='recipe_created_at_id_idx'),
+            models.Index(fields=['author', '-created_at', '-id'],
+                         name='recipe_author_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} - {self.author}'
 
 
+class RecipePopularity(models.Model):
+    """Предрассчитанный рейтинг популярности рецепта."""
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='popularity'
+    )
+    score = models.FloatField()
+    favorites_count = models.PositiveIntegerField(default=0)
+    shopping_cart_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='popularity_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.score:.3f}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика автора."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    created_at = models.DateTimeField(help_text="Время публикации рецепта")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'],
+                         name='feed_user_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe_id}'
+
+
 class RecipeIngredient(models.Model):
     """Связь ингредиента и  рецепта."""
 
@@ -137,3 +203,54 @@ class RecipeIngredient(models.Model):
                 name='unique_recipe_ingredient'
             ),
         ]
+
+
+class ShoppingListExport(models.Model):
+    """Задание на фоновую выгрузку списка покупок."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF'),
+        ('txt', 'TXT'),
+        ('csv', 'CSV'),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='shopping_list_exports'
+    )
+    file_format = models.CharField(
+        max_length=MAX_LENGTH_EXPORT_FORMAT, choices=FORMAT_CHOICES,
+        default='pdf'
+    )
+    status = models.CharField(
+        max_length=MAX_LENGTH_EXPORT_STATUS, choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    file = models.FileField(upload_to='shopping_lists/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text='Когда воркер взял задание в работу'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'],
+                         name='export_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.file_format} ({self.status})'
@@ -0,0 +1,74 @@
+import math
+
+from constants import (POPULARITY_CART_WEIGHT, POPULARITY_FAVORITE_WEIGHT,
+                       POPULARITY_TIME_SCALE)
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Recipe, RecipePopularity
+
+BATCH_SIZE = 500
+
+
+def hot_score(favorites_count, shopping_cart_count, created_at):
+    """Рейтинг: логарифм активности плюс бонус за свежесть рецепта.
+
+    Бонус растёт линейно со временем публикации, поэтому рейтинг
+    не нужно пересчитывать, пока у рецепта не изменилась активность.
+    """
+    activity = (favorites_count * POPULARITY_FAVORITE_WEIGHT
+                + shopping_cart_count * POPULARITY_CART_WEIGHT)
+    return (math.log10(activity + 1)
+            + created_at.timestamp() / POPULARITY_TIME_SCALE)
+
+
+def stale_recipes(full=False):
+    """Рецепты без рейтинга или со сменившимися с прошлого расчёта счётчиками.
+
+    Счётчики поддерживаются при каждом добавлении и удалении из избранного
+    и корзины, поэтому расхождение со снимком в таблице рейтинга означает
+    активность после последнего запуска.
+    """
+    queryset = Recipe.objects.order_by('pk')
+    if not full:
+        queryset = queryset.filter(
+            Q(popularity__isnull=True)
+            | ~Q(favorites_count=F('popularity__favorites_count'))
+            | ~Q(shopping_cart_count=F('popularity__shopping_cart_count'))
+        )
+    return queryset.values_list(
+        'pk', 'favorites_count', 'shopping_cart_count', 'created_at',
+        'popularity__recipe_id')
+
+
+@transaction.atomic
+def refresh_popularity(full=False, batch_size=BATCH_SIZE):
+    """Пересчитать рейтинг изменившихся рецептов, вернуть их число.
+
+    Рецепты читаются пачками по первичному ключу, чтобы запись в таблицу
+    рейтинга не пересекалась с открытым курсором.
+    """
+    refreshed, last_pk = 0, 0
+    while True:
+        batch = list(stale_recipes(full).filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        now = timezone.now()
+        created, updated = [], []
+        for pk, favorites, carts, created_at, existing in batch:
+            popularity = RecipePopularity(
+                recipe_id=pk,
+                score=hot_score(favorites, carts, created_at),
+                favorites_count=favorites,
+                shopping_cart_count=carts,
+                refreshed_at=now,
+            )
+            (updated if existing else created).append(popularity)
+        RecipePopularity.objects.bulk_create(created)
+        RecipePopularity.objects.bulk_update(
+            updated, ['score', 'favorites_count', 'shopping_cart_count',
+                      'refreshed_at'])
+        refreshed += len(batch)
+        last_pk = batch[-1][0]
+    return refreshed
@@ -0,0 +1,139 @@
+import re
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+BATCH_SIZE = 500
+TOKEN = re.compile(r'\w+')
+
+
+def build_search_document(name, description, ingredient_names):
+    """Текст для поиска: название, описание и названия ингредиентов."""
+    return '\n'.join([name, description, *ingredient_names])
+
+
+def sync_search_index(recipe_id, document=None, using='default'):
+    """Обновить строку рецепта в FTS5-таблице SQLite.
+
+    В PostgreSQL поиск идёт по GIN-индексу на search_document, который
+    база поддерживает сама.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id])
+        if document is not None:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, search_document) '
+                f'VALUES (%s, %s)', [recipe_id, document])
+
+
+def _ingredient_names(recipe_ids, get_model, using):
+    """Названия ингредиентов рецептов: {recipe_id: [название, ...]}."""
+    recipe_ingredient_model = get_model('recipes', 'RecipeIngredient')
+    ingredient_names = {}
+    rows = (
+        recipe_ingredient_model.objects.using(using)
+        .filter(recipe__in=recipe_ids)
+        .order_by('pk')
+        .values_list('recipe_id', 'ingredient__name'))
+    for recipe_id, name in rows:
+        ingredient_names.setdefault(recipe_id, []).append(name)
+    return ingredient_names
+
+
+def rebuild_search_documents(get_model=apps.get_model, using='default'):
+    """Пересобрать search_document всех рецептов, вернуть их число."""
+    recipe_model = get_model('recipes', 'Recipe')
+    rebuilt, last_pk = 0, 0
+    while True:
+        recipes = list(
+            recipe_model.objects.using(using)
+            .filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'name', 'description')[:BATCH_SIZE])
+        if not recipes:
+            break
+        ingredient_names = _ingredient_names(recipes, get_model, using)
+        for recipe in recipes:
+            recipe.search_document = build_search_document(
+                recipe.name, recipe.description,
+                ingredient_names.get(recipe.pk, []))
+            sync_search_index(recipe.pk, recipe.search_document, using)
+        recipe_model.objects.using(using).bulk_update(
+            recipes, ['search_document'])
+        rebuilt += len(recipes)
+        last_pk = recipes[-1].pk
+    return rebuilt
+
+
+def update_search_document(recipe_id, get_model=apps.get_model,
+                           using='default'):
+    """Пересобрать search_document рецепта, если он изменился.
+
+    Документ пишется через update(), поэтому сигналы рецепта
+    повторно не срабатывают.
+    """
+    recipe_model = get_model('recipes', 'Recipe')
+    recipes = recipe_model.objects.using(using).filter(pk=recipe_id)
+    row = recipes.values_list('name', 'description', 'search_document')
+    if not row:
+        return False
+    name, description, old_document = row[0]
+    document = build_search_document(
+        name, description,
+        _ingredient_names([recipe_id], get_model, using).get(recipe_id, []))
+    if document == old_document:
+        return False
+    recipes.update(search_document=document)
+    sync_search_index(recipe_id, document, using)
+    return True
+
+
+class SearchDocumentVector(Func):
+    """to_tsvector(search_document) в том же виде, что и в GIN-индексе."""
+
+    function = 'to_tsvector'
+    template = f"%(function)s('{SEARCH_CONFIG}', %(expressions)s)"
+
+
+def search_recipes(queryset, value):
+    """Отфильтровать рецепты по запросу и добавить релевантность search_rank.
+
+    PostgreSQL ищет по tsvector с GIN-индексом и ранжирует ts_rank,
+    SQLite — по FTS5-таблице и bm25. На прочих базах остаётся поиск
+    по вхождению без ранжирования.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVectorField)
+
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.alias(
+            search_vector=SearchDocumentVector(
+                'search_document', output_field=SearchVectorField())
+        ).filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query))
+
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in TOKEN.findall(value))
+        if not match:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+            [match], output_field=FloatField()
+        ))
+
+    return queryset.filter(search_document__icontains=value).annotate(
+        search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,101 @@
+import pytest
+
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAA'
+    'ggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(settings, tmp_path):
+    """Пустой кэш и отдельный каталог media для каждого теста."""
+    from api.authentication import _local_tokens
+    from django.core.cache import cache
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    _local_tokens.entries.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        email='user@example.com', username='user', password='Pass12345!x',
+        first_name='Имя', last_name='Фамилия')
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        email='author@example.com', username='author',
+        password='Pass12345!x', first_name='Имя', last_name='Фамилия')
+
+
+@pytest.fixture
+def api_client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def author_client(author):
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    token = Token.objects.create(user=author)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tag(db):
+    from recipes.models import Tag
+
+    return Tag.objects.create(name='Завтрак', slug='breakfast')
+
+
+@pytest.fixture
+def make_ingredients(db):
+    from recipes.models import Ingredient
+
+    def make(count, prefix='ингредиент'):
+        return [
+            Ingredient.objects.create(
+                name=f'{prefix} {number}', measurement_unit='г')
+            for number in range(count)
+        ]
+
+    return make
+
+
+@pytest.fixture
+def make_recipe(db, tag):
+    """Рецепт через ORM: name, ингредиенты с количествами и теги."""
+    from recipes.models import Recipe, RecipeIngredient
+
+    def make(author, ingredients=(), tags=None, name='Рецепт', **kwargs):
+        recipe = Recipe.objects.create(
+            author=author, name=name, image='recipes/test.png',
+            description=kwargs.pop('description', 'Описание'),
+            cooking_time=kwargs.pop('cooking_time', 10), **kwargs)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients)
+        recipe.tags.set([tag] if tags is None else tags)
+        return recipe
+
+    return make
@@ -0,0 +1,67 @@
+import pickle
+
+import pytest
+from api.authentication import (CachedTokenAuthentication, _local_tokens,
+                                _token_cache_key)
+from conftest import PNG
+from django.core.cache import cache
+from recipes.counters import update_counter
+from recipes.models import FeedEntry
+from rest_framework.authtoken.models import Token
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+def authenticate(token):
+    return CachedTokenAuthentication().authenticate_credentials(token.key)
+
+
+def test_cached_user_has_no_password_or_counters(
+        django_user_model, user, token, django_assert_num_queries):
+    authenticate(token)
+    _local_tokens.entries.clear()
+
+    with django_assert_num_queries(0):
+        cached_user, cached_token = authenticate(token)
+    assert cached_token.key == token.key
+    assert cached_user.pk == user.pk
+    assert cached_user.email == user.email
+    assert {'password', 'followers_count', 'recipes_count',
+            'feed_pull'} <= cached_user.get_deferred_fields()
+    assert user.password.encode() not in pickle.dumps(
+        cache.get(_token_cache_key(token.key)))
+
+
+def test_counters_are_read_from_database(django_user_model, user, token):
+    authenticate(token)
+    update_counter(django_user_model, user.pk, 'followers_count', 1)
+
+    cached_user, _ = authenticate(token)
+    assert cached_user.followers_count == 1
+
+
+def test_fan_out_ignores_stale_request_user(
+        settings, author, author_client, user_client, make_ingredients,
+        tag):
+    settings.FEED_FANOUT_LIMIT = 0
+    ingredient, = make_ingredients(1)
+    # Токен автора попадает в кэш, пока подписчиков у него нет.
+    assert author_client.get('/api/users/me/').status_code == 200
+    assert user_client.post(
+        f'/api/users/{author.id}/subscribe/').status_code == 201
+
+    response = author_client.post('/api/recipes/', {
+        'ingredients': [{'id': ingredient.id, 'amount': 1}],
+        'tags': [tag.id], 'image': PNG, 'name': 'Рецепт', 'text': 'Текст',
+        'cooking_time': 5,
+    }, format='json')
+
+    assert response.status_code == 201
+    assert not FeedEntry.objects.exists()
+    assert [recipe['id'] for recipe in user_client.get(
+        '/api/recipes/feed/').json()['results']] == [response.json()['id']]
@@ -0,0 +1,40 @@
+import pytest
+from recipes.models import RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+COOK_URL = '/api/recipes/cook/'
+
+
+def cook(client, ingredients):
+    response = client.get(COOK_URL, {'ingredients': ingredients})
+    assert response.status_code == 200
+    return [(recipe['id'], recipe['missing_ingredients_count'])
+            for recipe in response.json()]
+
+
+def test_orm_ingredient_changes_reach_index(
+        author, api_client, make_recipe, make_ingredients,
+        django_capture_on_commit_callbacks):
+    flour, egg, milk = make_ingredients(3)
+    # Индекс строится до изменений и дальше догоняет их по журналу.
+    assert cook(api_client, [flour.id]) == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = make_recipe(author, name='Блины')
+        for ingredient in (flour, egg):
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1)
+    assert cook(api_client, [flour.id]) == [(recipe.id, 1)]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient=egg).get().delete()
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=milk, amount=1)
+    assert cook(api_client, [flour.id, milk.id]) == [(recipe.id, 0)]
+    assert cook(api_client, [egg.id]) == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.delete()
+    assert cook(api_client, [flour.id]) == []
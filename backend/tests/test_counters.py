@@ -0,0 +1,105 @@
+import pytest
+from api.views import RecipeViewSet
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+
+def counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.shopping_cart_count
+
+
+def test_orm_recipes_update_author_counter(author, make_recipe):
+    recipe = make_recipe(author)
+    author.refresh_from_db()
+    assert author.recipes_count == 1
+
+    recipe.delete()
+    author.refresh_from_db()
+    assert author.recipes_count == 0
+
+
+def test_cascade_delete_decrements_counters(user, author, make_recipe):
+    recipe = make_recipe(author)
+    Favorite.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, following=author)
+    author.refresh_from_db()
+    assert counters(recipe) == (1, 1)
+    assert author.followers_count == 1
+
+    user.delete()
+
+    author.refresh_from_db()
+    assert counters(recipe) == (0, 0)
+    assert author.followers_count == 0
+
+
+def test_api_changes_counters_once(author, make_recipe, user_client):
+    recipe = make_recipe(author)
+    favorite = f'/api/recipes/{recipe.id}/favorite/'
+    subscribe = f'/api/users/{author.id}/subscribe/'
+
+    assert user_client.post(favorite).status_code == 201
+    assert user_client.post(subscribe).status_code == 201
+    author.refresh_from_db()
+    assert counters(recipe) == (1, 0)
+    assert author.followers_count == 1
+
+    assert user_client.delete(favorite).status_code == 204
+    assert user_client.delete(subscribe).status_code == 204
+    author.refresh_from_db()
+    assert counters(recipe) == (0, 0)
+    assert author.followers_count == 0
+
+
+def test_bulk_changes_counters_once(author, make_recipe, user_client):
+    recipes = [make_recipe(author, name=f'Рецепт {number}')
+               for number in range(2)]
+    url = '/api/recipes/shopping_cart/bulk/'
+    ids = {'recipes': [recipe.id for recipe in recipes]}
+
+    assert user_client.post(url, ids, format='json').status_code == 200
+    assert [counters(recipe) for recipe in recipes] == [(0, 1), (0, 1)]
+
+    assert user_client.delete(url, ids, format='json').status_code == 200
+    assert [counters(recipe) for recipe in recipes] == [(0, 0), (0, 0)]
+
+
+def test_api_recipe_delete_updates_author_counter(
+        author, make_recipe, author_client):
+    recipe = make_recipe(author)
+
+    assert author_client.delete(
+        f'/api/recipes/{recipe.id}/').status_code == 204
+
+    author.refresh_from_db()
+    assert author.recipes_count == 0
+    assert not Recipe.objects.exists()
+
+
+def test_bulk_skips_rows_inserted_concurrently(
+        user, author, make_recipe, user_client, monkeypatch):
+    recipe, other = (make_recipe(author, name=f'Рецепт {number}')
+                     for number in range(2))
+    get_bulk_state = RecipeViewSet.get_bulk_state
+
+    def stale_bulk_state(request, model):
+        # Проверка прошла до того, как параллельный запрос вставил строку.
+        ids, present = get_bulk_state(request, model)
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        return ids, present
+
+    monkeypatch.setattr(
+        RecipeViewSet, 'get_bulk_state', staticmethod(stale_bulk_state))
+    response = user_client.post(
+        '/api/recipes/shopping_cart/bulk/',
+        {'recipes': [recipe.id, other.id]}, format='json')
+
+    assert response.json() == [
+        {'id': recipe.id, 'status': 'exists'},
+        {'id': other.id, 'status': 'added'},
+    ]
+    assert [counters(item) for item in (recipe, other)] == [(0, 1), (0, 1)]
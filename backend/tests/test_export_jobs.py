@@ -0,0 +1,81 @@
+import os
+from datetime import timedelta
+
+import pytest
+from api.jobs import (STALE_JOB_ERROR, claim_next_job, process_jobs,
+                      requeue_stale_jobs, run_job)
+from constants import EXPORT_JOB_ATTEMPTS
+from django.utils import timezone
+from recipes.models import ShoppingListExport
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def job(user):
+    return ShoppingListExport.objects.create(user=user, file_format='txt')
+
+
+def abandon(job, seconds):
+    """Задание, взятое воркером, который остановился seconds назад."""
+    claimed = claim_next_job()
+    assert claimed.pk == job.pk
+    ShoppingListExport.objects.filter(pk=job.pk).update(
+        claimed_at=timezone.now() - timedelta(seconds=seconds))
+    job.refresh_from_db()
+    return job
+
+
+def test_claim_records_time_and_attempt(job):
+    claimed = claim_next_job()
+
+    claimed.refresh_from_db()
+    assert claimed.status == ShoppingListExport.RUNNING
+    assert claimed.claimed_at is not None
+    assert claimed.attempts == 1
+
+
+def test_running_job_within_timeout_is_kept(job, settings):
+    abandon(job, settings.EXPORT_JOB_TIMEOUT - 60)
+
+    assert requeue_stale_jobs() == 0
+    job.refresh_from_db()
+    assert job.status == ShoppingListExport.RUNNING
+
+
+def test_stale_job_is_requeued_and_finished(job, settings):
+    abandon(job, settings.EXPORT_JOB_TIMEOUT + 60)
+
+    assert process_jobs() == 1
+
+    job.refresh_from_db()
+    assert job.status == ShoppingListExport.DONE
+    assert job.attempts == 2
+    assert job.file
+
+
+def test_stale_job_fails_after_attempts(job, settings):
+    for _ in range(EXPORT_JOB_ATTEMPTS):
+        abandon(job, settings.EXPORT_JOB_TIMEOUT + 60)
+        requeue_stale_jobs()
+
+    job.refresh_from_db()
+    assert job.status == ShoppingListExport.FAILED
+    assert job.error == STALE_JOB_ERROR
+    assert job.finished_at is not None
+    assert process_jobs() == 0
+
+
+def test_late_worker_does_not_overwrite_requeued_job(job, settings):
+    late = abandon(job, settings.EXPORT_JOB_TIMEOUT + 60)
+    requeue_stale_jobs()
+    current = claim_next_job()
+
+    run_job(late)
+
+    current.refresh_from_db()
+    assert current.status == ShoppingListExport.RUNNING
+    assert not current.file
+    assert not late.file
+    assert not os.listdir(os.path.join(
+        settings.MEDIA_ROOT, 'shopping_lists'))
@@ -0,0 +1,146 @@
+import pytest
+from api.feed import trim_feeds
+from conftest import PNG
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recipes.models import FeedEntry, Recipe
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+FEED_URL = '/api/recipes/feed/'
+
+
+@pytest.fixture
+def make_client(django_user_model):
+    def make(name):
+        user = django_user_model.objects.create_user(
+            email=f'{name}@example.com', username=name,
+            password='Pass12345!x', first_name='Имя', last_name='Фамилия')
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client
+
+    return make
+
+
+def publish(client, ingredient, tag, name):
+    response = client.post('/api/recipes/', {
+        'ingredients': [{'id': ingredient.id, 'amount': 1}],
+        'tags': [tag.id], 'image': PNG, 'name': name, 'text': 'Текст',
+        'cooking_time': 5,
+    }, format='json')
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def feed(client):
+    response = client.get(FEED_URL)
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def test_pull_mode_is_sticky(
+        settings, author, author_client, make_client, make_ingredients,
+        tag):
+    settings.FEED_FANOUT_LIMIT = 1
+    ingredient, = make_ingredients(1)
+    first, second, late = (make_client(name)
+                           for name in ('first', 'second', 'late'))
+    subscribe = f'/api/users/{author.id}/subscribe/'
+
+    assert first.post(subscribe).status_code == 201
+    pushed = publish(author_client, ingredient, tag, 'Разложенный')
+    # Второй подписчик переводит автора на чтение при запросе ленты.
+    assert second.post(subscribe).status_code == 201
+    pulled = publish(author_client, ingredient, tag, 'Прочитанный')
+    assert late.post(subscribe).status_code == 201
+    # Подписчиков снова не больше лимита, но режим не меняется.
+    assert first.delete(subscribe).status_code == 204
+    assert second.delete(subscribe).status_code == 204
+
+    author.refresh_from_db()
+    assert author.followers_count == 1
+    assert author.feed_pull
+    assert feed(late) == [pulled, pushed]
+    assert feed(first) == []
+
+
+def test_small_author_is_pushed(
+        author, author_client, make_client, make_ingredients, tag):
+    ingredient, = make_ingredients(1)
+    follower = make_client('follower')
+    assert follower.post(
+        f'/api/users/{author.id}/subscribe/').status_code == 201
+    recipe_id = publish(author_client, ingredient, tag, 'Рецепт')
+
+    assert FeedEntry.objects.filter(recipe_id=recipe_id).count() == 1
+    assert feed(follower) == [recipe_id]
+
+
+@pytest.fixture
+def mixed_feed(user, author, django_user_model, make_recipe):
+    """Лента user: три разложенных рецепта и два автора на чтении.
+
+    У всех рецептов одинаковое время публикации, порядок задаёт id.
+    """
+    big = django_user_model.objects.create_user(
+        email='big@example.com', username='big', password='Pass12345!x',
+        first_name='Имя', last_name='Фамилия', feed_pull=True)
+    published = timezone.now()
+    pushed = [make_recipe(author, name=f'Разложенный {number}')
+              for number in range(3)]
+    pulled = [make_recipe(big, name=f'Прочитанный {number}')
+              for number in range(2)]
+    Recipe.objects.update(created_at=published)
+    FeedEntry.objects.bulk_create(
+        FeedEntry(user=user, recipe=recipe, created_at=published)
+        for recipe in pushed)
+    Follow.objects.create(user=user, following=author)
+    Follow.objects.create(user=user, following=big)
+    return sorted((recipe.id for recipe in pushed + pulled), reverse=True)
+
+
+def test_feed_pages_by_cursor(user_client, mixed_feed):
+    pages, url = [], f'{FEED_URL}?limit=2'
+    while url:
+        response = user_client.get(url)
+        assert response.status_code == 200
+        pages.append([recipe['id'] for recipe in response.json()['results']])
+        url = response.json()['next']
+
+    assert pages == [mixed_feed[:2], mixed_feed[2:4], mixed_feed[4:]]
+    assert user_client.get(
+        f'{FEED_URL}?cursor=broken').status_code == 404
+
+
+def test_feed_reads_timeline_without_count(user_client, mixed_feed):
+    with CaptureQueriesContext(connection) as queries:
+        assert feed(user_client) == mixed_feed
+
+    sql = [query['sql'] for query in queries.captured_queries]
+    assert not any('COUNT(' in query for query in sql)
+    assert any(query.startswith('SELECT') and 'FROM "recipes_feedentry"'
+               in query and 'ORDER BY' in query for query in sql)
+
+
+def test_feed_applies_filters(author, user_client, mixed_feed):
+    response = user_client.get(f'{FEED_URL}?author={author.id}')
+
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        pk for pk in mixed_feed
+        if Recipe.objects.get(pk=pk).author_id == author.id]
+
+
+def test_trim_keeps_entries_tied_with_cutoff(settings, user, mixed_feed):
+    settings.FEED_LENGTH = 2
+    kept = list(FeedEntry.objects.order_by(
+        '-recipe_id').values_list('recipe_id', flat=True)[:2])
+
+    assert trim_feeds() == 1
+    assert sorted(FeedEntry.objects.values_list(
+        'recipe_id', flat=True), reverse=True) == kept
@@ -0,0 +1,135 @@
+import base64
+import os
+
+import pytest
+from api.images import (FAILED_ATTEMPTS, build_variants, pending_images,
+                        process_pending_images)
+from conftest import PNG
+from constants import IMAGE_VARIANT_ATTEMPTS
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+AVATAR_URL = '/api/users/me/avatar/'
+
+
+def broken_render(field_file, sizes):
+    raise OSError('broken image')
+
+
+def variant_paths(variants):
+    return [path for formats in variants.values()
+            for path in formats.values()]
+
+
+def stored_files(settings):
+    return sorted(
+        os.path.relpath(os.path.join(folder, name), settings.MEDIA_ROOT)
+        for folder, _, names in os.walk(settings.MEDIA_ROOT)
+        for name in names)
+
+
+@pytest.fixture
+def recipe_with_image(author, make_recipe):
+    recipe = make_recipe(author)
+    recipe.image.save('test.png', ContentFile(
+        base64.b64decode(PNG.split(',', 1)[1])))
+    return recipe
+
+
+@pytest.fixture
+def upload_avatar(user_client, django_capture_on_commit_callbacks):
+    def upload():
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_client.put(
+                AVATAR_URL, {'avatar': PNG}, format='json')
+        assert response.status_code == 200
+
+    return upload
+
+
+def test_failed_build_is_null_and_retried(
+        author, make_recipe, api_client, monkeypatch):
+    recipe = make_recipe(author)
+    monkeypatch.setattr('api.images.render_variants', broken_render)
+
+    for attempt in range(1, IMAGE_VARIANT_ATTEMPTS + 1):
+        assert pending_images(Recipe).filter(pk=recipe.pk).exists()
+        assert process_pending_images() == 0
+        recipe.refresh_from_db()
+        assert recipe.image_variants == {FAILED_ATTEMPTS: attempt}
+
+    assert not pending_images(Recipe).filter(pk=recipe.pk).exists()
+    response = api_client.get(f'/api/recipes/{recipe.pk}/')
+    assert response.json()['image_variants'] is None
+
+
+def test_delete_avatar_removes_variants(
+        user, user_client, upload_avatar, settings,
+        django_capture_on_commit_callbacks):
+    upload_avatar()
+    user.refresh_from_db()
+    paths = variant_paths(user.avatar_variants)
+    assert all(default_storage.exists(path) for path in paths)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.delete(AVATAR_URL)
+    assert response.status_code == 204
+
+    user.refresh_from_db()
+    assert user.avatar_variants is None
+    assert stored_files(settings) == []
+    assert user_client.get('/api/users/me/').json()['avatar_variants'] is None
+
+
+def test_replaced_avatar_removes_old_variants(user, upload_avatar):
+    upload_avatar()
+    user.refresh_from_db()
+    old_paths = variant_paths(user.avatar_variants)
+
+    upload_avatar()
+    user.refresh_from_db()
+    new_paths = variant_paths(user.avatar_variants)
+
+    assert not set(old_paths) & set(new_paths)
+    assert not any(default_storage.exists(path) for path in old_paths)
+    assert all(default_storage.exists(path) for path in new_paths)
+
+
+def test_deleted_recipe_removes_variants(
+        recipe_with_image, settings, django_capture_on_commit_callbacks):
+    recipe = recipe_with_image
+    assert build_variants(Recipe, recipe.pk)
+    recipe.refresh_from_db()
+    recipe.image.delete(save=False)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.delete()
+
+    assert stored_files(settings) == []
+
+
+def test_second_build_keeps_first_variants(
+        recipe_with_image, settings, django_capture_on_commit_callbacks):
+    recipe = recipe_with_image
+    assert build_variants(Recipe, recipe.pk)
+    recipe.refresh_from_db()
+    built = recipe.image_variants
+    files = stored_files(settings)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert not build_variants(Recipe, recipe.pk)
+
+    recipe.refresh_from_db()
+    assert recipe.image_variants == built
+    assert stored_files(settings) == files
+
+
+def test_worker_requires_async_variants(settings):
+    settings.IMAGE_VARIANTS_ASYNC = False
+    with pytest.raises(CommandError):
+        call_command('process_image_variants')
+    call_command('process_image_variants', '--once')
@@ -0,0 +1,44 @@
+import pytest
+from api.cache import CONTENT_VERSION, POPULARITY_VERSION, get_version
+from django.core.management import call_command
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = '/api/recipes/'
+POPULAR_URL = '/api/recipes/popular/'
+
+
+def recipe_ids(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def refresh_popularity(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('refresh_popularity')
+
+
+def test_refresh_resets_only_popular_responses(
+        author, make_recipe, api_client, django_assert_num_queries,
+        django_capture_on_commit_callbacks):
+    first = make_recipe(author, name='Первый')
+    second = make_recipe(author, name='Второй')
+    refresh_popularity(django_capture_on_commit_callbacks)
+    latest = recipe_ids(api_client, LIST_URL)
+    assert recipe_ids(api_client, POPULAR_URL) == [second.pk, first.pk]
+    content = get_version(CONTENT_VERSION)
+    popularity = get_version(POPULARITY_VERSION)
+
+    Recipe.objects.filter(pk=first.pk).update(favorites_count=10)
+    refresh_popularity(django_capture_on_commit_callbacks)
+
+    assert get_version(CONTENT_VERSION) == content
+    assert get_version(POPULARITY_VERSION) != popularity
+    with django_assert_num_queries(0):
+        assert recipe_ids(api_client, LIST_URL) == latest
+    assert recipe_ids(api_client, POPULAR_URL) == [first.pk, second.pk]
+    assert recipe_ids(
+        api_client, f'{LIST_URL}?ordering=popular')[:2] == [
+            first.pk, second.pk]
@@ -0,0 +1,34 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = '/api/recipes/'
+
+
+def fill_recipes(make_recipe, make_ingredients, author, recipes, ingredients):
+    ingredients = make_ingredients(ingredients)
+    for number in range(recipes):
+        make_recipe(author, ingredients, name=f'Рецепт {number}')
+
+
+@pytest.mark.parametrize('client_name, params, expected_queries', [
+    ('api_client', {}, 4),
+    # Фильтр по флагам пользователя идёт мимо общего кэша, в базу.
+    ('user_client', {'is_favorited': 0}, 6),
+])
+@pytest.mark.parametrize('limit, ingredients', [(1, 2), (10, 20)])
+def test_list_query_count_does_not_grow(
+        request, django_assert_num_queries, make_recipe, make_ingredients,
+        author, client_name, params, expected_queries, limit, ingredients):
+    client = request.getfixturevalue(client_name)
+    fill_recipes(make_recipe, make_ingredients, author, 10, ingredients)
+
+    with django_assert_num_queries(expected_queries):
+        response = client.get(LIST_URL, {'limit': limit, **params})
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == limit
+    assert all(len(recipe['ingredients']) == ingredients
+               for recipe in results)
+    assert all(len(recipe['tags']) == 1 for recipe in results)
@@ -0,0 +1,83 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+TABLE = RecipeIngredient._meta.db_table
+WRITE = re.compile(rf'(INSERT|UPDATE|DELETE)\b(?: INTO| FROM)? "{TABLE}"')
+
+
+def patch_recipe(client, recipe, tag, amounts):
+    return client.patch(f'/api/recipes/{recipe.id}/', {
+        'ingredients': [{'id': ingredient.id, 'amount': amount}
+                        for ingredient, amount in amounts],
+        'tags': [tag.id],
+        'name': recipe.name,
+        'text': recipe.description,
+        'cooking_time': recipe.cooking_time,
+    }, format='json')
+
+
+def table_writes(queries):
+    """Число INSERT, UPDATE и DELETE по таблице ингредиентов рецепта."""
+    writes = {'INSERT': 0, 'UPDATE': 0, 'DELETE': 0}
+    for query in queries:
+        match = WRITE.match(query['sql'])
+        if match:
+            writes[match.group(1)] += 1
+    return writes
+
+
+def amounts(recipe):
+    return dict(RecipeIngredient.objects.filter(
+        recipe=recipe).values_list('ingredient_id', 'amount'))
+
+
+def test_changed_amount_is_one_update(
+        author, author_client, make_recipe, make_ingredients, tag):
+    first, second, third = make_ingredients(3)
+    recipe = make_recipe(author, [first, second, third])
+
+    with CaptureQueriesContext(connection) as context:
+        response = patch_recipe(
+            author_client, recipe, tag, [(first, 1), (second, 5), (third, 1)])
+
+    assert response.status_code == 200
+    assert table_writes(context.captured_queries) == {
+        'INSERT': 0, 'UPDATE': 1, 'DELETE': 0}
+    assert amounts(recipe) == {first.id: 1, second.id: 5, third.id: 1}
+
+
+def test_diff_removes_updates_and_adds(
+        author, author_client, make_recipe, make_ingredients, tag):
+    removed, changed, kept, added = make_ingredients(4)
+    recipe = make_recipe(author, [removed, changed, kept])
+
+    with CaptureQueriesContext(connection) as context:
+        response = patch_recipe(
+            author_client, recipe, tag, [(changed, 7), (kept, 1), (added, 3)])
+
+    assert response.status_code == 200
+    assert table_writes(context.captured_queries) == {
+        'INSERT': 1, 'UPDATE': 1, 'DELETE': 1}
+    assert amounts(recipe) == {changed.id: 7, kept.id: 1, added.id: 3}
+    assert [item['id'] for item in response.json()['ingredients']] == [
+        changed.id, kept.id, added.id]
+
+
+def test_unchanged_ingredients_are_not_written(
+        author, author_client, make_recipe, make_ingredients, tag):
+    ingredients = make_ingredients(2)
+    recipe = make_recipe(author, ingredients)
+
+    with CaptureQueriesContext(connection) as context:
+        response = patch_recipe(
+            author_client, recipe, tag, [(item, 1) for item in ingredients])
+
+    assert response.status_code == 200
+    assert table_writes(context.captured_queries) == {
+        'INSERT': 0, 'UPDATE': 0, 'DELETE': 0}
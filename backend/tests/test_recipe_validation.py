@@ -0,0 +1,114 @@
+import pytest
+from api.serializers import RecipeCreateSerializer
+from conftest import PNG
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+pytestmark = pytest.mark.django_db
+
+MESSAGES = PrimaryKeyRelatedField.default_error_messages
+
+
+def recipe_data(ingredients, tags):
+    return {
+        'ingredients': ingredients,
+        'tags': tags,
+        'image': PNG,
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+    }
+
+
+def validate(data):
+    serializer = RecipeCreateSerializer(data=data)
+    return serializer.is_valid(), serializer.errors
+
+
+@pytest.fixture
+def tags(db):
+    from recipes.models import Tag
+
+    return [Tag.objects.create(name=f'Тег {number}', slug=f'tag-{number}')
+            for number in range(5)]
+
+
+def test_large_recipe_is_validated_with_one_query_per_relation(
+        django_assert_num_queries, make_ingredients, tags):
+    ingredients = make_ingredients(25)
+    data = recipe_data(
+        [{'id': item.id, 'amount': 10} for item in ingredients],
+        [tag.id for tag in tags])
+
+    with django_assert_num_queries(2):
+        valid, errors = validate(data)
+
+    assert valid, errors
+
+
+def test_unknown_ids(make_ingredients, tag):
+    ingredient, = make_ingredients(1)
+
+    valid, errors = validate(recipe_data(
+        [{'id': ingredient.id, 'amount': 1}, {'id': 999, 'amount': 1}],
+        [tag.id, 998]))
+
+    assert not valid
+    assert errors['ingredients'] == [
+        {}, {'id': [MESSAGES['does_not_exist'].format(pk_value=999)]}]
+    assert errors['tags'] == [MESSAGES['does_not_exist'].format(pk_value=998)]
+
+
+def test_duplicate_ids(make_ingredients, tag):
+    ingredient, = make_ingredients(1)
+
+    valid, errors = validate(recipe_data(
+        [{'id': ingredient.id, 'amount': 1}] * 2, [tag.id]))
+    assert not valid
+    assert errors == {
+        'ingredients': ['Поле ingredients содержит дублирующиеся значения!']}
+
+    valid, errors = validate(recipe_data(
+        [{'id': ingredient.id, 'amount': 1}], [tag.id, tag.id]))
+    assert not valid
+    assert errors == {'tags': ['Поле tags содержит дублирующиеся значения!']}
+
+
+def test_wrong_type_ids(make_ingredients, tag):
+    ingredient, = make_ingredients(1)
+
+    valid, errors = validate(recipe_data(
+        [{'id': ingredient.id, 'amount': 1}, {'id': [1], 'amount': 1}],
+        [tag.id, {'id': 1}]))
+
+    assert not valid
+    assert errors['ingredients'] == [
+        {}, {'id': [MESSAGES['incorrect_type'].format(data_type='list')]}]
+    assert errors['tags'] == [
+        MESSAGES['incorrect_type'].format(data_type='dict')]
+
+    valid, errors = validate(recipe_data('1', tag.id))
+    assert not valid
+    assert errors['ingredients'] == {'non_field_errors': [
+        serializers.ListSerializer.default_error_messages[
+            'not_a_list'].format(input_type='str')]}
+    assert errors['tags'] == [serializers.ManyRelatedField
+                              .default_error_messages['not_a_list']
+                              .format(input_type='int')]
+
+
+def test_missing_ids(make_ingredients, tag):
+    ingredient, = make_ingredients(1)
+    required = serializers.Field.default_error_messages['required']
+
+    valid, errors = validate(recipe_data([{'amount': 1}], []))
+    assert not valid
+    assert errors['ingredients'] == [{'id': [required]}]
+    assert errors['tags'] == [serializers.ManyRelatedField
+                              .default_error_messages['empty']]
+
+    data = recipe_data([{'id': ingredient.id, 'amount': 1}], [tag.id])
+    del data['ingredients'], data['tags']
+    valid, errors = validate(data)
+    assert not valid
+    assert errors == {'ingredients': [required], 'tags': [required]}
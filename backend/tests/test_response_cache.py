@@ -0,0 +1,43 @@
+import pytest
+from api.cache import CONTENT_VERSION, get_version
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = '/api/recipes/'
+
+
+def ingredient_names(client):
+    response = client.get(LIST_URL)
+    assert response.status_code == 200
+    return [item['name'] for recipe in response.json()['results']
+            for item in recipe['ingredients']]
+
+
+def test_ingredient_rename_resets_cached_recipes(
+        author, api_client, make_recipe, make_ingredients,
+        django_capture_on_commit_callbacks):
+    ingredient, = make_ingredients(1, prefix='сахар')
+    make_recipe(author, [ingredient])
+    assert ingredient_names(api_client) == ['сахар 0']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.name = 'сахарная пудра'
+        ingredient.save()
+
+    assert ingredient_names(api_client) == ['сахарная пудра']
+
+
+def test_signup_keeps_cached_responses(
+        django_user_model, django_capture_on_commit_callbacks):
+    version = get_version(CONTENT_VERSION)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user = django_user_model.objects.create_user(
+            email='new@example.com', username='new', password='Pass12345!x',
+            first_name='Имя', last_name='Фамилия')
+    assert get_version(CONTENT_VERSION) == version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = 'Другое'
+        user.save()
+    assert get_version(CONTENT_VERSION) != version
@@ -0,0 +1,73 @@
+import pytest
+from conftest import PNG
+from recipes.models import Recipe, RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = '/api/recipes/'
+
+
+def search(client, value):
+    response = client.get(LIST_URL, {'search': value})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def test_recipe_created_through_orm_is_found(
+        author, api_client, make_ingredients, tag,
+        django_capture_on_commit_callbacks):
+    potato, = make_ingredients(1, prefix='картофель')
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        recipe = Recipe.objects.create(
+            author=author, name='Драники', image='recipes/test.png',
+            description='Тёртые клубни', cooking_time=30)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=potato, amount=500)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=make_ingredients(1, 'лук')[0],
+            amount=50)
+
+    # Документ пересобирается один раз на транзакцию.
+    assert [getattr(callback, 'commit_key', None)
+            for callback in callbacks].count(
+        ('search_document', recipe.id)) == 1
+    recipe.refresh_from_db()
+    assert 'картофель 0' in recipe.search_document
+    assert search(api_client, 'драники') == [recipe.id]
+    assert search(api_client, 'картофель') == [recipe.id]
+
+
+def test_ingredient_changes_update_document(
+        author, api_client, make_recipe, make_ingredients,
+        django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = make_recipe(author, name='Суп')
+        row = RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=make_ingredients(1, 'морковь')[0],
+            amount=1)
+    assert search(api_client, 'морковь') == [recipe.id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        row.delete()
+    assert search(api_client, 'морковь') == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=make_ingredients(1, 'свёкла')[0],
+            amount=1)
+    assert search(api_client, 'свёкла') == [recipe.id]
+
+
+def test_recipe_created_through_api_is_found(
+        author_client, api_client, make_ingredients, tag,
+        django_capture_on_commit_callbacks):
+    ingredient, = make_ingredients(1, prefix='гречка')
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.post(LIST_URL, {
+            'ingredients': [{'id': ingredient.id, 'amount': 100}],
+            'tags': [tag.id], 'image': PNG, 'name': 'Каша',
+            'text': 'На воде', 'cooking_time': 20,
+        }, format='json')
+    assert response.status_code == 201
+
+    assert search(api_client, 'гречка') == [response.json()['id']]
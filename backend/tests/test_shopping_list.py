@@ -0,0 +1,26 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.mark.parametrize('accept, content_type', [
+    ('application/json', 'application/pdf'),
+    ('*/*', 'application/pdf'),
+    ('text/csv', 'text/csv'),
+])
+def test_download_negotiates_format(user_client, accept, content_type):
+    response = user_client.get(DOWNLOAD_URL, HTTP_ACCEPT=accept)
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith(content_type)
+
+
+def test_download_format_param_wins(user_client):
+    response = user_client.get(
+        f'{DOWNLOAD_URL}?format=txt', HTTP_ACCEPT='application/json')
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+    assert user_client.get(f'{DOWNLOAD_URL}?format=xml').status_code == 404
@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-17 04:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pull_authors(apps, schema_editor):
+    """Авторы, которые уже читаются при запросе ленты, остаются такими."""
+    User = apps.get_model('users', 'MyUser')
+    User.objects.filter(
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).update(feed_pull=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_myuser_avatar_variants'),
+        ('recipes', '0010_populate_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='myuser',
+            name='feed_pull',
+            field=models.BooleanField(default=False, editable=False, help_text='Рецепты читаются при запросе ленты, а не раскладываются'),
+        ),
+        migrations.RunPython(mark_pull_authors, migrations.RunPython.noop),
+    ]
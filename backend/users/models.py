@@ -12,6 +12,14 @@ class MyUser(AbstractUser):
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=MAX_LENGTH_USERS)
     last_name = models.CharField(max_length=MAX_LENGTH_USERS)
+    recipes_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    feed_pull = models.BooleanField(
+        default=False, editable=False,
+        help_text='Рецепты читаются при запросе ленты, а не раскладываются')
+    avatar_variants = models.JSONField(
+        null=True, blank=True, editable=False,
+        help_text='Уменьшенные копии; пусто, пока они не построены')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username']